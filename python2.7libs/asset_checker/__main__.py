@@ -0,0 +1,15 @@
+import sys
+
+# The batch audit only starts hython processes and doesn't need hou itself
+if sys.argv[1:2] == ["batch"]:
+    from batch import main
+    sys.exit(main(sys.argv[2:]))
+
+# Verifying an archive only reads files
+if sys.argv[1:2] == ["verify"]:
+    from archive_verify import main
+    sys.exit(main(sys.argv[2:]))
+
+from cli import main
+
+sys.exit(main())
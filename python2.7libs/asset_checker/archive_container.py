@@ -0,0 +1,257 @@
+import hashlib
+import io
+import os
+import tarfile
+import threading
+import time
+import zipfile
+import zlib
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from archive_manifest import manifest_entry, manifest_json, manifest_name
+from copy_engine import CopyCancelled, CopyEngine, buffer_size
+
+container_formats = ("tar", "tar.gz", "tar.zst", "zip")
+
+
+def available_formats():
+    """
+    Container formats that can be written here, '.tar.zst' needs the 'zstandard' module.
+    """
+
+    return tuple(container_format for container_format in container_formats
+                 if container_format != "tar.zst" or zstandard != None)
+
+
+class JobReader(object):
+    """
+    Read-only file wrapper handed to tarfile / zipfile.
+    Counts and hashes the bytes as they stream through and stops on cancel.
+    """
+
+    def __init__(self, engine, job, source_file):
+        self.engine = engine
+        self.job = job
+        self.source_file = source_file
+        self.checksum = hashlib.md5()
+
+    def read(self, size=-1):
+        if self.engine.cancelled:
+            raise CopyCancelled()
+
+        buffer = self.source_file.read(size)
+        self.checksum.update(buffer)
+
+        with self.engine.lock:
+            self.engine.bytes_done += len(buffer)
+
+        return buffer
+
+
+class ArchiveContainer(object):
+    """
+    A tar (optionally gzip or zstd compressed) or zip file written front to back.
+    Zip entries are stored, most referenced files are compressed already.
+    """
+
+    def __init__(self, path, container_format):
+        self.tar = None
+        self.zip = None
+        self.compressor = None
+        self.raw = None
+
+        if container_format == "zip":
+            self.zip = zipfile.ZipFile(path, "w", zipfile.ZIP_STORED, allowZip64=True)
+            return
+
+        if container_format == "tar.zst" and zstandard == None:
+            raise ImportError("The 'zstandard' module is needed to write .tar.zst archives")
+
+        self.raw = open(path, "wb")
+
+        if container_format == "tar.zst":
+            self.compressor = zstandard.ZstdCompressor(threads=-1).stream_writer(self.raw)
+            self.tar = tarfile.open(fileobj=self.compressor, mode="w|", bufsize=buffer_size)
+        elif container_format == "tar.gz":
+            self.tar = tarfile.open(fileobj=self.raw, mode="w|gz", bufsize=buffer_size)
+        else:
+            self.tar = tarfile.open(fileobj=self.raw, mode="w|", bufsize=buffer_size)
+
+    def add_file(self, source, arcname, reader):
+        """
+        Stream 'source' into the container through 'reader', a 'JobReader' on the open source file.
+        Symlinked sources are stored with their content.
+        """
+
+        stat = os.stat(source)
+
+        if self.tar != None:
+            tarinfo = tarfile.TarInfo(arcname)
+            tarinfo.size = stat.st_size
+            tarinfo.mtime = stat.st_mtime
+            tarinfo.mode = stat.st_mode & 0o777
+            self.tar.addfile(tarinfo, reader)
+
+        elif hasattr(zipfile.ZipInfo, "from_file"):
+            zipinfo = zipfile.ZipInfo.from_file(source, arcname)
+            with self.zip.open(zipinfo, "w", force_zip64=True) as zip_file:
+                while True:
+                    buffer = reader.read(buffer_size)
+                    if not buffer:
+                        break
+                    zip_file.write(buffer)
+
+        else:
+            self.write_zip_entry(arcname, stat, reader)
+
+    def write_zip_entry(self, arcname, stat, reader):
+        """
+        Stream a stored zip entry from 'reader' on Python 2, whose zipfile can't write into an entry.
+        Written the way 'ZipFile.write' does it: the header first, the data, then the header again
+        with the CRC and sizes, so the entry is hashed and can be cancelled like any other.
+        """
+
+        zipinfo = zipfile.ZipInfo(arcname, time.localtime(stat.st_mtime)[0:6])
+        zipinfo.external_attr = (stat.st_mode & 0xFFFF) << 16
+        zipinfo.compress_type = zipfile.ZIP_STORED
+        zipinfo.file_size = stat.st_size
+        zipinfo.header_offset = self.zip.fp.tell()
+
+        self.zip._writecheck(zipinfo)
+        self.zip._didModify = True
+
+        zip64 = zipinfo.file_size > zipfile.ZIP64_LIMIT
+        zipinfo.CRC = 0
+        zipinfo.compress_size = 0
+        self.zip.fp.write(zipinfo.FileHeader(zip64))
+
+        crc = 0
+        size = 0
+        while True:
+            buffer = reader.read(buffer_size)
+            if not buffer:
+                break
+
+            crc = zlib.crc32(buffer, crc) & 0xffffffff
+            size += len(buffer)
+            self.zip.fp.write(buffer)
+
+        if size > zipfile.ZIP64_LIMIT and not zip64:
+            raise IOError(arcname + " grew while it was archived")
+
+        zipinfo.CRC = crc
+        zipinfo.file_size = size
+        zipinfo.compress_size = size
+
+        position = self.zip.fp.tell()
+        self.zip.fp.seek(zipinfo.header_offset)
+        self.zip.fp.write(zipinfo.FileHeader(zip64))
+        self.zip.fp.seek(position)
+
+        self.zip.filelist.append(zipinfo)
+        self.zip.NameToInfo[zipinfo.filename] = zipinfo
+
+    def add_bytes(self, arcname, data):
+        if self.tar != None:
+            tarinfo = tarfile.TarInfo(arcname)
+            tarinfo.size = len(data)
+            tarinfo.mtime = time.time()
+            self.tar.addfile(tarinfo, io.BytesIO(data))
+        else:
+            self.zip.writestr(arcname, data)
+
+    def close(self):
+        if self.tar != None:
+            self.tar.close()
+        if self.zip != None:
+            self.zip.close()
+        if self.compressor != None:
+            self.compressor.close()
+        if self.raw != None and not self.raw.closed:
+            self.raw.close()
+
+
+class ContainerEngine(CopyEngine):
+    """
+    Streams all jobs into a single tar or zip file with one writer thread instead of copying loose files.
+    The destination of a job is its path inside the container. Checksums are computed while
+    streaming and a JSON manifest is added as the last entry.
+    """
+
+    relink_rows = False
+
+    def __init__(self, path, container_format):
+        super(ContainerEngine, self).__init__(workers=1)
+
+        self.path = path
+        self.container_format = container_format
+        self.container = None
+        self.entries = {}
+
+    def start(self):
+        # Sorted by path, so tiles and frames stay together in the container
+        tasks = queue.Queue()
+        for destination in sorted(self.jobs):
+            tasks.put(self.jobs[destination])
+
+        self.start_time = time.time()
+
+        thread = threading.Thread(target=self._write, args=(tasks,), name="asset_checker_container")
+        thread.daemon = True
+        thread.start()
+        self.threads.append(thread)
+
+    def _write(self, tasks):
+        try:
+            self.container = ArchiveContainer(self.path, self.container_format)
+        except Exception as e:
+            self.errors.append((self.path, str(e)))
+            self.files_done = len(self.jobs)
+            return
+
+        try:
+            self._worker(tasks)
+
+            if not self.cancelled:
+                self.container.add_bytes(manifest_name, manifest_json(self.entries).encode("utf-8"))
+        except Exception as e:
+            self.errors.append((self.path, str(e)))
+        finally:
+            try:
+                self.container.close()
+            except Exception as e:
+                self.errors.append((self.path, str(e)))
+
+            # A cancelled container is unusable
+            if self.cancelled:
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+
+    def transfer_job(self, job):
+        with open(job.source, "rb", buffer_size) as source_file:
+            reader = JobReader(self, job, source_file)
+
+            try:
+                self.container.add_file(job.source, job.destination, reader)
+            except CopyCancelled:
+                raise
+            except Exception:
+                # Nothing can follow a partly written entry, the container is removed
+                self.cancelled = True
+                raise
+
+        job.checksum = reader.checksum.hexdigest()
+
+        with self.lock:
+            self.entries[job.destination] = manifest_entry(job)
@@ -0,0 +1,125 @@
+import json
+import os
+import threading
+
+journal_name = "asset_checker_journal.jsonl"
+
+# Bytes copied between two progress records of the same file
+progress_interval = 256 * 1024 * 1024
+
+
+class ArchiveJournal(object):
+    """
+    Log of a running archive, one JSON record per line in the archive root.
+
+    Every planned file is recorded with the size and mtime of its source, then the bytes
+    flushed to the destination every 'progress_interval' and finally when it's done.
+    Records are appended and flushed one by one, so a crash loses at most the last line.
+    A restarted archive skips finished files and continues the ones that were cut off.
+    The journal is removed once an archive finished without errors.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.path = root + "/" + journal_name
+        self.lock = threading.Lock()
+        self.journal_file = None
+
+        self.planned = {}
+        self.progress = {}
+        self.done = {}
+
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r") as journal_file:
+                lines = journal_file.readlines()
+        except (IOError, OSError):
+            return
+
+        for line in lines:
+            try:
+                record = json.loads(line)
+                key = record["file"]
+                kind = record["type"]
+            except (ValueError, KeyError, TypeError):
+                # The last line of a crashed archive may be cut off
+                continue
+
+            if kind == "plan":
+                self.planned[key] = (record.get("size"), record.get("mtime"))
+                self.progress.pop(key, None)
+                self.done.pop(key, None)
+            elif kind == "progress":
+                self.progress[key] = record.get("bytes", 0)
+            elif kind == "done":
+                self.done[key] = record.get("checksum")
+
+    def resuming(self):
+        """
+        True if a previous archive into the same root didn't finish.
+        """
+
+        return bool(self.planned)
+
+    def key(self, destination):
+        return os.path.relpath(destination, self.root).replace("\\", "/")
+
+    def resume_offset(self, destination, size, mtime):
+        """
+        Bytes of 'destination' a previous run already wrote, 'size' if it finished the file.
+        None if it has to be copied from the start, also when the source changed since.
+        """
+
+        key = self.key(destination)
+        if self.planned.get(key) != (size, mtime):
+            return None
+
+        if key in self.done:
+            return size
+
+        return self.progress.get(key)
+
+    def checksum(self, destination):
+        return self.done.get(self.key(destination))
+
+    def write(self, record):
+        with self.lock:
+            if self.journal_file == None:
+                self.journal_file = open(self.path, "a")
+
+            self.journal_file.write(json.dumps(record, sort_keys=True) + "\n")
+            self.journal_file.flush()
+
+    def plan(self, job):
+        """
+        Record a 'CopyJob' before it starts. Files planned the same way by the previous run keep their progress.
+        """
+
+        key = self.key(job.destination)
+        if self.planned.get(key) == (job.size, job.mtime):
+            return
+
+        self.planned[key] = (job.size, job.mtime)
+        self.write({"type": "plan", "file": key, "source": job.source, "size": job.size, "mtime": job.mtime})
+
+    def record_progress(self, job, written):
+        self.write({"type": "progress", "file": self.key(job.destination), "bytes": written})
+
+    def record_done(self, job):
+        self.write({"type": "done", "file": self.key(job.destination), "checksum": job.checksum})
+
+    def close(self):
+        with self.lock:
+            if self.journal_file != None:
+                self.journal_file.close()
+                self.journal_file = None
+
+    def remove(self):
+        self.close()
+
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
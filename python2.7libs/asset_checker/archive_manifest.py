@@ -0,0 +1,99 @@
+import json
+import os
+
+manifest_name = "asset_checker_manifest.json"
+
+UNCHANGED = "unchanged"
+CHANGED = "changed"
+VERIFY = "verify"
+
+
+def manifest_entry(job):
+    """
+    Manifest entry of a copied 'CopyJob'.
+    """
+
+    return {"source": job.source,
+            "size": job.size,
+            "mtime": job.mtime,
+            "checksum": job.checksum}
+
+
+def manifest_json(files):
+    """
+    Manifest text of a dict of archive path -> 'manifest_entry'.
+    """
+
+    return json.dumps({"version": 1, "files": files}, indent=1, sort_keys=True)
+
+
+class ArchiveManifest(object):
+    """
+    Size, mtime and optionally a checksum of every source file copied into an archive,
+    stored as JSON in the archive root. A re-archive only copies files that changed since.
+    """
+
+    def __init__(self, root, use_checksum=False):
+        self.root = root
+        self.path = root + "/" + manifest_name
+        self.use_checksum = use_checksum
+        self.files = {}
+
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r") as manifest_file:
+                self.files = json.load(manifest_file).get("files", {})
+        except (IOError, OSError, ValueError, AttributeError):
+            self.files = {}
+
+    def save(self):
+        """
+        Write the manifest through a temporary file, so an interrupted save keeps the old one.
+        """
+
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as manifest_file:
+            manifest_file.write(manifest_json(self.files))
+
+        # os.rename doesn't replace existing files on Windows
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        os.rename(temp_path, self.path)
+
+    def key(self, destination):
+        """
+        Path of 'destination' relative to the archive root.
+        """
+
+        return os.path.relpath(destination, self.root).replace("\\", "/")
+
+    def compare(self, destination, size, mtime):
+        """
+        Compare a source file against the manifest entry of its destination.
+        Returns UNCHANGED, CHANGED, or VERIFY when only the mtime differs and the checksum has to decide.
+        """
+
+        entry = self.files.get(self.key(destination))
+        if entry == None or entry.get("size") != size:
+            return CHANGED
+
+        if entry.get("mtime") == mtime:
+            return UNCHANGED
+
+        if self.use_checksum and entry.get("checksum"):
+            return VERIFY
+
+        return CHANGED
+
+    def checksum(self, destination):
+        entry = self.files.get(self.key(destination))
+        return entry.get("checksum") if entry != None else None
+
+    def record(self, job):
+        """
+        Store the source state of a copied or skipped 'CopyJob'.
+        """
+
+        self.files[self.key(job.destination)] = manifest_entry(job)
@@ -0,0 +1,237 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tarfile
+import threading
+import zipfile
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from archive_manifest import ArchiveManifest, manifest_name
+from copy_engine import CopyCancelled, buffer_size
+from crawler import default_workers, map_threaded
+
+
+class ArchiveVerifier(object):
+    """
+    Re-hashes the files of an archive and compares them with the checksums stored in its manifest
+    while they were copied. Folder archives are hashed with a pool of threads, tar and zip
+    containers in a single pass since their entries can only be read in order.
+    Files archived without checksums are reported as 'unchecked', a verification that
+    couldn't check every file doesn't count as passed, see 'status'.
+    """
+
+    def __init__(self, path, workers=default_workers):
+        self.path = path.replace("\\", "/")
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.cancelled = False
+
+        self.files_done = 0
+        self.files_total = 0
+        self.bytes_done = 0
+
+        self.verified = 0
+        self.mismatched = []
+        self.missing = []
+        self.unchecked = []
+        self.errors = []
+
+    def run(self):
+        try:
+            if os.path.isdir(self.path):
+                self.verify_folder()
+            else:
+                self.verify_container()
+        except CopyCancelled:
+            pass
+        except Exception as e:
+            self.errors.append((self.path, str(e)))
+
+    def cancel(self):
+        self.cancelled = True
+
+    def hash_file(self, file_object):
+        checksum = hashlib.md5()
+        while True:
+            if self.cancelled:
+                raise CopyCancelled()
+
+            buffer = file_object.read(buffer_size)
+            if not buffer:
+                return checksum.hexdigest()
+
+            checksum.update(buffer)
+
+            with self.lock:
+                self.bytes_done += len(buffer)
+
+    def compare(self, key, expected, checksum):
+        """
+        Sort an archived file by the checksum of its manifest entry and the one it has now, None if it's gone.
+        """
+
+        with self.lock:
+            self.files_done += 1
+
+            if checksum == None:
+                self.missing.append(key)
+            elif expected == None:
+                self.unchecked.append(key)
+            elif checksum != expected:
+                self.mismatched.append(key)
+            else:
+                self.verified += 1
+
+    def verify_folder(self):
+        manifest = ArchiveManifest(self.path)
+        if not manifest.files:
+            raise IOError("No manifest found in " + self.path)
+
+        self.files_total = len(manifest.files)
+
+        def hash_entry(key):
+            file_path = self.path + "/" + key
+            if not os.path.isfile(file_path):
+                return None
+
+            # Nothing to compare against, the file only has to exist
+            if manifest.files[key].get("checksum") == None:
+                return ""
+
+            with open(file_path, "rb") as archived_file:
+                return self.hash_file(archived_file)
+
+        for key, checksum, error in map_threaded(hash_entry, sorted(manifest.files), self.workers):
+            if isinstance(error, CopyCancelled):
+                continue
+
+            if error != None:
+                with self.lock:
+                    self.errors.append((key, str(error)))
+                continue
+
+            self.compare(key, manifest.files[key].get("checksum"), checksum)
+
+    def verify_container(self):
+        checksums = {}
+        manifest_data = None
+
+        for name, entry in self.container_entries():
+            if name == manifest_name:
+                manifest_data = entry.read()
+            else:
+                checksums[name] = self.hash_file(entry)
+
+        if manifest_data == None:
+            raise IOError("No manifest found in " + self.path)
+
+        files = json.loads(manifest_data.decode("utf-8")).get("files", {})
+        self.files_total = len(files)
+
+        for key in sorted(files):
+            self.compare(key, files[key].get("checksum"), checksums.get(key))
+
+    def container_entries(self):
+        """
+        Yield (name, readable file) of every file in a tar or zip container, in order.
+        """
+
+        if zipfile.is_zipfile(self.path):
+            container = zipfile.ZipFile(self.path, "r")
+            try:
+                for info in container.infolist():
+                    entry = container.open(info)
+                    try:
+                        yield info.filename, entry
+                    finally:
+                        entry.close()
+            finally:
+                container.close()
+            return
+
+        with open(self.path, "rb") as raw:
+            if self.path.endswith(".zst"):
+                if zstandard == None:
+                    raise ImportError("The 'zstandard' module is needed to read .tar.zst archives")
+                stream = zstandard.ZstdDecompressor().stream_reader(raw)
+                container = tarfile.open(fileobj=stream, mode="r|", bufsize=buffer_size)
+            else:
+                container = tarfile.open(fileobj=raw, mode="r|*", bufsize=buffer_size)
+
+            try:
+                for member in container:
+                    if member.isfile():
+                        yield member.name, container.extractfile(member)
+            finally:
+                container.close()
+
+    def status_text(self):
+        return "Verifying - " + str(self.files_done) + " / " + str(self.files_total) + " files | " + \
+               str(len(self.mismatched)) + " mismatched | " + str(len(self.missing)) + " missing"
+
+    def status(self):
+        """
+        'failed' if files mismatched, are missing or couldn't be read, 'cancelled', 'unchecked'
+        if files had no checksum to compare against or nothing was verified, otherwise 'ok'.
+        """
+
+        if self.mismatched or self.missing or self.errors:
+            return "failed"
+
+        if self.cancelled:
+            return "cancelled"
+
+        if self.unchecked or self.verified == 0:
+            return "unchecked"
+
+        return "ok"
+
+    def report(self):
+        return {"archive": self.path,
+                "status": self.status(),
+                "files": self.files_total,
+                "verified": self.verified,
+                "mismatched": sorted(self.mismatched),
+                "missing": sorted(self.missing),
+                "unchecked": sorted(self.unchecked),
+                "errors": [{"file": key, "error": error} for key, error in self.errors],
+                "cancelled": self.cancelled}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="hython -m asset_checker verify",
+                                     description="Re-hash the files of an archive folder, tar or zip file and compare them "
+                                                 "with the checksums of its manifest. Exits with 1 on any mismatch and "
+                                                 "with 2 if files could not be checked, e.g. archived without checksums.")
+
+    parser.add_argument("archive", help="Archive folder or container file.")
+    parser.add_argument("--workers", type=int, default=default_workers, help="Files hashed at the same time in folders.")
+    parser.add_argument("--report", default="-", help="JSON report file, '-' for stdout (default).")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    verifier = ArchiveVerifier(args.archive, args.workers)
+    verifier.run()
+    report = verifier.report()
+
+    text = json.dumps(report, indent=1, sort_keys=True)
+    if args.report == "-":
+        sys.stdout.write(text + "\n")
+    else:
+        with open(args.report, "w") as report_file:
+            report_file.write(text)
+
+    if report["status"] == "failed":
+        return 1
+
+    return 0 if report["status"] == "ok" else 2
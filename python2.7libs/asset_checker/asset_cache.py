@@ -0,0 +1,199 @@
+import os
+import sqlite3
+import time
+
+from archive_manifest import CHANGED, UNCHANGED
+
+# Cached parms point at '$ASSET_CACHE/...', set as a global variable saved with the scene
+cache_variable = "ASSET_CACHE"
+cache_db_name = "asset_checker_cache.db"
+
+default_cache_size = 50 * 1024 * 1024 * 1024
+
+
+def cache_key(path):
+    """
+    Path of a source file inside the cache. The kind of root is the first component, so it can be
+    mapped back, e.g. 'G:/tex/a.exr' -> 'G/tex/a.exr', '//server/share/a.exr' -> 'unc/server/share/a.exr'
+    and '/mnt/tex/a.exr' -> 'root/mnt/tex/a.exr'.
+    """
+
+    path = path.replace("\\", "/")
+
+    if path.startswith("//"):
+        return "unc/" + path[2:].lstrip("/")
+
+    if len(path) > 1 and path[1] == ":":
+        return path[0].upper() + "/" + path[2:].lstrip("/")
+
+    return "root/" + path.lstrip("/")
+
+
+def source_path(key):
+    """
+    Source file of a 'cache_key'.
+    """
+
+    first, separator, rest = key.partition("/")
+
+    if first == "unc":
+        return "//" + rest
+
+    if first == "root":
+        return "/" + rest
+
+    return first + ":/" + rest
+
+
+class AssetCache(object):
+    """
+    Local read-through cache for files on network shares, e.g. on an SSD.
+
+    Files are copied below 'root' mirroring their source path, see 'cache_key'. Size, mtime and
+    last use of every cached file are stored in a SQLite file in the root, so the cache survives
+    restarts and can be shared by several sessions. A file is copied again once the size or mtime
+    of its source changed. When the cache grows above 'max_bytes' the least recently used
+    files are evicted, never the ones the current scene uses.
+
+    Implements the manifest interface of a 'CopyEngine', so it can be passed in as an incremental manifest.
+    """
+
+    def __init__(self, root, max_bytes=default_cache_size):
+        self.root = root.replace("\\", "/").rstrip("/")
+        self.path = self.root + "/" + cache_db_name
+        self.max_bytes = max_bytes
+        self.use_checksum = False
+
+        self.entries = {}
+        self.used = {}
+
+        if not os.path.isdir(self.root):
+            os.makedirs(self.root)
+
+        self.load()
+
+    def connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, size INTEGER, mtime REAL, last_used REAL)")
+        return connection
+
+    def load(self):
+        try:
+            connection = self.connect()
+            try:
+                self.entries = dict((key, (size, mtime)) for key, size, mtime in
+                                    connection.execute("SELECT key, size, mtime FROM entries"))
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            # Everything is copied again, a broken index must not fail the scene
+            self.entries = {}
+
+    def key(self, destination):
+        return os.path.relpath(destination, self.root).replace("\\", "/")
+
+    def cache_path(self, source):
+        """
+        File path of 'source' inside the cache.
+        """
+
+        return self.root + "/" + cache_key(source)
+
+    def parm_path(self, directory, name):
+        """
+        Parm path of a file in 'directory' once it's cached, 'name' may contain a UDIM or frame token.
+        """
+
+        return "$" + cache_variable + "/" + cache_key(directory).rstrip("/") + "/" + name
+
+    def compare(self, destination, size, mtime):
+        if self.entries.get(self.key(destination)) == (size, mtime):
+            return UNCHANGED
+
+        return CHANGED
+
+    def checksum(self, destination):
+        return None
+
+    def record(self, job):
+        """
+        Mark the file of a copied or skipped 'CopyJob' as used by this run.
+        """
+
+        self.used[self.key(job.destination)] = (job.size, job.mtime)
+
+    def size(self):
+        return sum(size for size, mtime in self.entries.values())
+
+    def save(self):
+        """
+        Store the files used by this run as the most recently used ones, then evict files above the cap.
+        """
+
+        now = time.time()
+
+        try:
+            connection = self.connect()
+            try:
+                with connection:
+                    connection.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                                           [(key, size, mtime, now) for key, (size, mtime) in self.used.items()])
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            raise IOError("Asset cache index " + self.path + ": " + str(e))
+
+        self.entries.update(self.used)
+        self.evict(self.used)
+
+    def make_room(self, engine):
+        """
+        Evict files before a 'CopyEngine' runs, so the files it copies fit below the cap.
+        Returns the amount of evicted bytes.
+        """
+
+        return self.evict(set(self.key(destination) for destination in engine.jobs), engine.bytes_total)
+
+    def evict(self, keep=(), needed=0):
+        """
+        Remove the least recently used files not in 'keep' until 'needed' more bytes fit below the cap.
+        Returns the amount of evicted bytes.
+        """
+
+        try:
+            connection = self.connect()
+            try:
+                total = connection.execute("SELECT SUM(size) FROM entries").fetchone()[0] or 0
+                if total + needed <= self.max_bytes:
+                    return 0
+
+                evicted = []
+                freed = 0
+                for key, size in connection.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall():
+                    if total + needed - freed <= self.max_bytes:
+                        break
+
+                    if key in keep:
+                        continue
+
+                    try:
+                        os.remove(self.root + "/" + key)
+                    except OSError:
+                        # In use by another program, it's tried again next time
+                        if os.path.exists(self.root + "/" + key):
+                            continue
+
+                    evicted.append(key)
+                    freed += size
+
+                with connection:
+                    connection.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in evicted])
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            raise IOError("Asset cache index " + self.path + ": " + str(e))
+
+        for key in evicted:
+            self.entries.pop(key, None)
+
+        return freed
@@ -1,18 +1,39 @@
 import hou
+import json
 import os
 import shutil
-import re
+import tempfile
+import threading
 
 from PySide2 import QtCore
 from PySide2 import QtWidgets
 from PySide2 import QtGui
 from PySide2 import QtUiTools
 
+from archive_container import ContainerEngine, available_formats, container_formats
+from archive_journal import ArchiveJournal
+from archive_manifest import ArchiveManifest
+from archive_verify import ArchiveVerifier
+from asset_cache import AssetCache
+from asset_model import AssetModel
+from copy_engine import CopyEngine, COPY, SYMLINK, collect_modes, format_size
+from crawler import DirectoryListing, default_workers, existing_directory, split_path
+from disk_usage import DiskUsage, free_space
+from file_index import FuzzyIndex
+from path_mapping import PathMapping
+from scene_assets import apply_path_mapping, build_search_index, check_rows, collect_rows, expand_cache, \
+                         expand_real_path, expand_string, list_row_directories, path_status, relink_row, \
+                         resolve_variable, row_expanded, row_writes, schedule_archive, schedule_cache, schedule_copy, \
+                         set_cache_variable, set_parms, split_search_paths, uncache_rows
+
 scriptpath = os.path.dirname(__file__)
 asset_checker_path = hou.getenv("dmnk")
 settings_path = asset_checker_path + "/config/asset_checker_config"
+index_path = asset_checker_path + "/config/asset_checker_index.db"
 version = "2.00"
 
+archive_formats = ("folder",) + container_formats
+
 # Icons
 missing_Icon = hou.qt.Icon("BUTTONS_list_delete")
 found_Icon = hou.qt.Icon("SCENEGRAPH_loaded_on")
@@ -38,29 +59,207 @@ _variable_Name = None
 _only_missing_CB = None
 _include_out_CB = None
 _make_archive_B = None
+_workers_SB = None
+_cancel_B = None
+_filter_Line = None
+_incremental_CB = None
+_checksum_CB = None
+_collect_Mode_CB = None
+_archive_Format_CB = None
+_fuzzy_Relink_CB = None
+_path_Map_Table = None
+_cache_B = None
+_cache_Path = None
+_cache_Size_SB = None
+_asset_Model = None
 
 # Initialize Variables
 isConfigOpen = 0
 isOptionsOpen = 0
 _missing_Textures_Index_List = []
-_all_Files_List = []
 _amount_Missing_Textures = 0
 _amount_files_relinked = 0
 _amount_files_copied = 0
+_scan_Worker = None
+_copy_Engine = None
+_archive_Verifier = None
+_asset_Watcher = None
+
+class ScanWorker(QtCore.QThread):
+    """
+    Checks the real paths of the asset list on disk, off the UI thread.
+    Rows are grouped by directory, every directory is listed once and the
+    results are sent back in chunks of (row, exists, missing frames) tuples.
+    'row_paths' holds (row, path, sequence) tuples, see 'scene_assets.path_status'.
+    With 'usage_rows', the rows and their 'row_expanded' results, the referenced files
+    are sized from the same listings once all rows are checked, see 'disk_usage.DiskUsage'.
+    Sizing sends (done, total) files every 'chunk_size' files and stops on cancel as well.
+    """
+
+    chunk_ready = QtCore.Signal(list)
+    usage_progress = QtCore.Signal(int, int)
+
+    def __init__(self, row_paths, workers, chunk_size=500, usage_rows=None, parent=None):
+        super(ScanWorker, self).__init__(parent)
+
+        self.row_paths = row_paths
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.listing = DirectoryListing(workers)
+        self.usage_rows = usage_rows
+        self.usage = None
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        rows_by_directory = {}
+        for row, item_Path, sequence in self.row_paths:
+            rows_by_directory.setdefault(split_path(item_Path)[0], []).append((row, item_Path, sequence))
+
+        chunk = []
+        listed = self.listing.prefetch_iter(rows_by_directory)
+
+        try:
+            for directory in listed:
+                if self.cancelled:
+                    break
+
+                for row, item_Path, sequence in rows_by_directory[directory]:
+                    chunk.append((row,) + path_status(self.listing, item_Path, sequence))
+
+                if len(chunk) >= self.chunk_size:
+                    self.chunk_ready.emit(chunk)
+                    chunk = []
+        finally:
+            listed.close()
+
+        if chunk and not self.cancelled:
+            self.chunk_ready.emit(chunk)
+
+        if self.usage_rows != None and not self.cancelled:
+            rows, expanded = self.usage_rows
+            usage = DiskUsage(rows, self.listing, self.workers, expanded, self.is_cancelled, self.sizing_progress)
+
+            if not self.cancelled:
+                self.usage = usage
+
+    def is_cancelled(self):
+        return self.cancelled
+
+    def sizing_progress(self, done, total):
+        if done % self.chunk_size == 0 or done == total:
+            self.usage_progress.emit(done, total)
+
+
+class AssetWatcher(QtCore.QObject):
+    """
+    Watches the directories of the asset list with a 'QFileSystemWatcher' and only rechecks
+    the rows of a directory when files in it appear or vanish. Rows of directories that don't
+    exist yet are watched through their closest existing parent. Changes are collected for
+    'delay' ms, so a render writing hundreds of frames causes a single recheck.
+    At most 'max_directories' directories are watched, to stay below the inotify limit.
+    """
+
+    rows_checked = QtCore.Signal(list)
+
+    max_directories = 4096
+
+    def __init__(self, delay=500, parent=None):
+        super(AssetWatcher, self).__init__(parent)
+
+        self.watcher = QtCore.QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.directory_changed)
 
-tex_extensions = (".pic", ".pic.Z", ".picZ", ".pic.gz", ".picgz", ".rat", ".tbf", ".dsm",
-                  ".picnc", ".piclc", ".rgb", ".rgba", ".sgi", ".tif", ".tif3", ".tif16", 
-                  ".tif32", ".tiff", ".yuv", ".pix", ".als", ".cin", ".kdk", ".jpg", ".jpeg",
-                  ".exr", ".png", ".psd", ".psb", ".si", ".tga", ".vst", ".vtg", ".rla", ".rla16",
-                  ".rlb", ".rlb16", ".bmp", ".hdr", ".ptx", ".ptex", ".ies", ".qtl")
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.recheck)
 
-geo_extensions = (".geo", ".bgeo", ".geo.gz", ".geogz", ".bgeo.gz", ".bgeogz", ".geo.sc",
-                  ".geosc", ".bgeo.sc", ".bgeosc", ".poly", ".bpoly", ".d", ".rib", ".GoZ",
-                  ".bgeo.lzma", ".bgeo.bz2", ".pmap", ".geo.lzma", ".off",
-                  ".igs", ".ply", ".obj", ".pdb", ".lw", ".lwo", ".geo.bz2", ".bstl", ".eps",
-                  ".ai", ".stl", ".dxf", ".abc", ".fbx")
+        self.row_paths = {}
+        self.changed = set()
+
+    def watch(self, row_paths):
+        """
+        Watch a list of (row, path, sequence) tuples instead of the current ones.
+        """
+
+        self.clear()
+
+        watched = {}
+        for row, item_path, sequence in row_paths:
+            directory = split_path(item_path)[0]
+            if directory not in watched:
+                watched[directory] = existing_directory(directory)
+
+            if watched[directory] != None:
+                self.row_paths.setdefault(watched[directory], []).append((row, item_path, sequence))
+
+        directories = sorted(self.row_paths)[:self.max_directories]
+        if directories:
+            self.watcher.addPaths(directories)
+
+    def recheck_rows(self, rows):
+        """
+        Recheck the directories of 'rows' soon, e.g. after their results were dropped.
+        """
+
+        for directory, row_paths in self.row_paths.items():
+            if any(row in rows for row, item_path, sequence in row_paths):
+                self.changed.add(directory)
+
+        if self.changed:
+            self.timer.start()
+
+    def clear(self):
+        self.timer.stop()
+        self.changed = set()
+        self.row_paths = {}
+
+        directories = self.watcher.directories()
+        if directories:
+            self.watcher.removePaths(directories)
+
+    def directory_changed(self, directory):
+        self.changed.add(directory)
+        self.timer.start()
+
+    def recheck(self):
+        """
+        Check the rows of all changed directories with one listing each and emit (row, exists, missing frames) tuples.
+        Rows move to a deeper directory when it was created, or up to a parent when theirs was removed.
+        """
+
+        listing = DirectoryListing()
+        chunk = []
+
+        changed = self.changed
+        self.changed = set()
+
+        for directory in changed:
+            row_paths = self.row_paths.pop(directory, [])
+
+            for row, item_path, sequence in row_paths:
+                chunk.append((row,) + path_status(listing, item_path, sequence))
+
+                watched = existing_directory(split_path(item_path)[0])
+                if watched != None:
+                    self.row_paths.setdefault(watched, []).append((row, item_path, sequence))
+
+        watched = set(self.watcher.directories())
+        for directory in changed:
+            if directory in watched and directory not in self.row_paths:
+                self.watcher.removePath(directory)
+
+        added = [directory for directory in self.row_paths if directory not in watched]
+        added = added[:max(0, self.max_directories - len(watched))]
+        if added:
+            self.watcher.addPaths(added)
+
+        if chunk:
+            self.rows_checked.emit(chunk)
 
-sim_extensions = (".sim", ".vdb")
 
 class AssetChecker(QtWidgets.QWidget):
     def __init__(self):
@@ -110,6 +309,20 @@ class AssetChecker(QtWidgets.QWidget):
         global _only_missing_CB
         global _include_out_CB
         global _make_archive_B
+        global _workers_SB
+        global _cancel_B
+        global _filter_Line
+        global _incremental_CB
+        global _checksum_CB
+        global _collect_Mode_CB
+        global _archive_Format_CB
+        global _fuzzy_Relink_CB
+        global _path_Map_Table
+        global _cache_B
+        global _cache_Path
+        global _cache_Size_SB
+        global _asset_Model
+        global _asset_Watcher
 
         _status = self.ui.status
         _options_B = self.ui.options_B
@@ -128,6 +341,27 @@ class AssetChecker(QtWidgets.QWidget):
         _only_missing_CB = self.ui.only_missing_CB
         _include_out_CB = self.ui.include_out_CB
         _make_archive_B = self.ui.archive_B
+        _workers_SB = self.ui.workers_SB
+        _cancel_B = self.ui.cancel_B
+        _filter_Line = self.ui.filter_Line
+        _incremental_CB = self.ui.incremental_CB
+        _checksum_CB = self.ui.checksum_CB
+        _collect_Mode_CB = self.ui.collect_Mode_CB
+        _archive_Format_CB = self.ui.archive_Format_CB
+        _fuzzy_Relink_CB = self.ui.fuzzy_Relink_CB
+        _path_Map_Table = self.ui.path_Map_Table
+        _cache_B = self.ui.cache_B
+        _cache_Path = self.ui.cache_Path
+        _cache_Size_SB = self.ui.cache_Size_SB
+
+        # Asset list
+        _asset_Model = AssetModel(found_Icon, missing_Icon, self)
+        _asset_List.setModel(_asset_Model)
+        _asset_List.horizontalHeader().setSortIndicator(-1, QtCore.Qt.AscendingOrder)
+
+        # Live missing status while files land on disk
+        _asset_Watcher = AssetWatcher(parent=self)
+        _asset_Watcher.rows_checked.connect(self.apply_watch_chunk)
 
         # Set Button Icons
         _reload_B.setIcon(QtGui.QIcon(reload_Icon))
@@ -147,12 +381,39 @@ class AssetChecker(QtWidgets.QWidget):
         _variable_Name.setText(self.settings.value("var_Name", ""))
         _only_missing_CB.setChecked(str(self.settings.value("only_Missing_CB", False)).lower() == 'true')
         _include_out_CB.setChecked(str(self.settings.value("include_out", False)).lower() == 'true')
+        _workers_SB.setValue(int(self.settings.value("crawl_Workers", default_workers)))
+        _incremental_CB.setChecked(str(self.settings.value("incremental_Archive", False)).lower() == 'true')
+        _checksum_CB.setChecked(str(self.settings.value("archive_Checksum", False)).lower() == 'true')
+        _fuzzy_Relink_CB.setChecked(str(self.settings.value("fuzzy_Relink", False)).lower() == 'true')
+        _cache_Path.setText(self.settings.value("cache_Path", ""))
+        _cache_Size_SB.setValue(int(self.settings.value("cache_Size", 50)))
+
+        try:
+            path_Map = json.loads(self.settings.value("path_Mapping", "[]"))
+        except (TypeError, ValueError):
+            path_Map = []
+
+        self.path_mapping = PathMapping(path_Map)
+        self.fill_path_map_table(self.path_mapping.to_list())
+
+        collect_Mode = self.settings.value("collect_Mode", COPY)
+        if collect_Mode in collect_modes:
+            _collect_Mode_CB.setCurrentIndex(collect_modes.index(collect_Mode))
+
+        for i, archive_Format in enumerate(archive_formats):
+            if archive_Format != "folder" and archive_Format not in available_formats():
+                _archive_Format_CB.model().item(i).setEnabled(False)
+
+        archive_Format = self.settings.value("archive_Format", "folder")
+        if archive_Format in archive_formats and _archive_Format_CB.model().item(archive_formats.index(archive_Format)).isEnabled():
+            _archive_Format_CB.setCurrentIndex(archive_formats.index(archive_Format))
 
         _options_B.clicked.connect(self.open_options)
         _open_File_Dialog.clicked.connect(self.open_file_dialog)
         _open_File_Dialog.clicked.connect(self.updateConfig)
         _relink_B.clicked.connect(self.relink_paths)
         _copy_B.clicked.connect(self.copy_files_button)
+        _cache_B.clicked.connect(self.cache_files)
         _texPath_input.editingFinished.connect(self.updateConfig)
         _geoPath_input.editingFinished.connect(self.updateConfig)
         _simPath_input.editingFinished.connect(self.updateConfig)
@@ -162,8 +423,36 @@ class AssetChecker(QtWidgets.QWidget):
         _only_missing_CB.clicked.connect(self.updateConfig)
         _include_out_CB.clicked.connect(self.updateConfig)
         _make_archive_B.clicked.connect(self.make_archive)
+        _workers_SB.valueChanged.connect(self.updateConfig)
+        _incremental_CB.clicked.connect(self.updateConfig)
+        _checksum_CB.clicked.connect(self.updateConfig)
+        _fuzzy_Relink_CB.clicked.connect(self.updateConfig)
+        _path_Map_Table.itemChanged.connect(self.update_path_mapping)
+        _cache_Path.editingFinished.connect(self.updateConfig)
+        _cache_Size_SB.valueChanged.connect(self.updateConfig)
+        _collect_Mode_CB.currentIndexChanged.connect(self.updateConfig)
+        _archive_Format_CB.currentIndexChanged.connect(self.updateConfig)
+        _cancel_B.clicked.connect(self.cancel_scan)
+        _cancel_B.clicked.connect(self.cancel_copy)
+        _cancel_B.clicked.connect(self.cancel_verify)
+        _cancel_B.hide()
+
+        # Copy progress is polled from the 'CopyEngine'
+        self.copy_timer = QtCore.QTimer(self)
+        self.copy_timer.setInterval(250)
+        self.copy_timer.timeout.connect(self.update_copy)
+        self.archive_temp_dir = None
+        self.watch_dropped = set()
+
+        # Archive verification runs in a thread and is polled the same way
+        self.verify_timer = QtCore.QTimer(self)
+        self.verify_timer.setInterval(250)
+        self.verify_timer.timeout.connect(self.update_verify)
+        self.verify_thread = None
+
+        _filter_Line.textChanged.connect(_asset_Model.set_filter)
+        _asset_List.clicked.connect(self.jump_to_node)
 
-        _asset_List.itemClicked.connect(self.jump_to_node)
         # Parse scene
         self.parse_scene()
 
@@ -179,6 +468,14 @@ class AssetChecker(QtWidgets.QWidget):
         varName = _variable_Name.text()
         onlyMissing = _only_missing_CB.isChecked()
         includeOut = _include_out_CB.isChecked()
+        workers = _workers_SB.value()
+        incremental = _incremental_CB.isChecked()
+        checksum = _checksum_CB.isChecked()
+        fuzzyRelink = _fuzzy_Relink_CB.isChecked()
+        cachePath = self.convert_backslash(_cache_Path.text())
+        cacheSize = _cache_Size_SB.value()
+        collectMode = self.collect_mode()
+        archiveFormat = self.archive_format()
 
         self.settings.setValue("tex_Path", texPath)
         self.settings.setValue("geo_Path", geoPath)
@@ -187,6 +484,14 @@ class AssetChecker(QtWidgets.QWidget):
         self.settings.setValue("var_Name", varName)
         self.settings.setValue("only_Missing_CB", onlyMissing)
         self.settings.setValue("include_out", includeOut)
+        self.settings.setValue("crawl_Workers", workers)
+        self.settings.setValue("incremental_Archive", incremental)
+        self.settings.setValue("archive_Checksum", checksum)
+        self.settings.setValue("fuzzy_Relink", fuzzyRelink)
+        self.settings.setValue("cache_Path", cachePath)
+        self.settings.setValue("cache_Size", cacheSize)
+        self.settings.setValue("collect_Mode", collectMode)
+        self.settings.setValue("archive_Format", archiveFormat)
 
     def hideEvent(self, event):
         """
@@ -202,450 +507,808 @@ class AssetChecker(QtWidgets.QWidget):
         """
 
         if event.key() == QtCore.Qt.Key_Delete:
-            if len(_asset_List.selectedItems()) > 0:
-                try:
-                    global _missing_Textures_Index_List
-                    global _amount_Missing_Textures
-                    global _all_Files_List
-                    _missing_Textures_Index_List = []
-                    _amount_Missing_Textures = 0
-
-                    sel_Items = _asset_List.selectedItems()
-
-                    for item in sel_Items:
-                        x =  _asset_List.indexFromItem(item)
-                        y = QtCore.QPersistentModelIndex(x)
-                        if y.isValid():
-                            _asset_List.removeRow(y.row())
-                except:
-                    pass
-
-                for i in range(_asset_List.rowCount()):
-                    # Updates the missing textures index list after deleting entries
-                    item_Path = _asset_List.item(i, 2).text()
-                    if not os.path.exists(item_Path):
-                        _amount_Missing_Textures += 1
-                        _missing_Textures_Index_List.append(i)
-                status_text = "Status: Found - " + str(len(_all_Files_List)) + " | " + "Missing - " + str(_amount_Missing_Textures)
+            sel_rows = self.selected_rows()
+            if len(sel_rows) > 0 and not self.is_scanning() and not self.is_copying():
+                _asset_Model.remove_rows(sel_rows)
+
+                # Updates the missing textures index list after deleting entries
+                self.missing_texture_count()
+                status_text = "Status: Found - " + str(len(_asset_Model.rows)) + " | " + "Missing - " + str(_amount_Missing_Textures)
                 _status.setText(status_text)
             else:
                 pass
                 
     def parse_scene(self):
         """
-        '_all_Files_List structure':
-        Index | Parm
-        0     | Path to node
-        1     | Path to file
-        2     | Node parm
-        3     | Is UDIM boolean
-        4     | Is Sequence boolean
-        5     | Index
+        Collect all file references of the scene into '_asset_Model'.
+        Every reference is stored as an 'AssetRow', see 'scene_assets'.
         """
 
         global _missing_Textures_Index_List
-        global _all_Files_List
         global _amount_Missing_Textures
+        global _scan_Worker
+
+        # Reference collection needs hou and stays on the main thread,
+        # the disk checks run in a 'ScanWorker'
+        self.cancel_scan()
+        _asset_Watcher.clear()
 
-        _asset_List.clearContents()
+        rows = collect_rows(_include_out_CB.isChecked(), self.path_mapping)
+
+        _asset_Model.set_rows(rows)
 
-        all_Files = hou.fileReferences()
-        _all_Files_List_temp = []
-        _all_Files_List = {}
         _missing_Textures_Index_List = []
         _amount_Missing_Textures = 0
 
-        for parm, filePath in all_Files:
-            if parm != None:
-                if _include_out_CB.isChecked() == False:
-                    parm_parent = parm.node().parent().type().name()
+        row_paths = [(index, self.convert_backslash(row.real_path), row.sequence) for index, row in enumerate(rows)]
 
-                    if parm_parent != "out":
-                        if parm_parent != "ropnet":
-                            if filePath.endswith(tex_extensions) | filePath.endswith(geo_extensions) | filePath.endswith(sim_extensions):
-                                _all_Files_List_temp.append((parm ,filePath))
-                else:
-                    if filePath.endswith(tex_extensions) | filePath.endswith(geo_extensions) | filePath.endswith(sim_extensions):
-                        _all_Files_List_temp.append((parm ,filePath))
+        self.scan_total = len(row_paths)
+        self.scan_done = 0
 
-        for index, parm_tuple in enumerate(_all_Files_List_temp):
-            parm = parm_tuple[0]
-            file = parm_tuple[1]
+        # Paths are expanded here, hou can't be used in the worker
+        expanded = [row_expanded(row) for row in rows]
 
-            if parm != None:
-                if file.endswith(tex_extensions) | file.endswith(geo_extensions) | file.endswith(sim_extensions):
-                    nodePath = parm.node().path()
-                    filePath = self.convert_backslash(file)
+        _scan_Worker = ScanWorker(row_paths, _workers_SB.value(), usage_rows=(rows, expanded), parent=self)
+        _scan_Worker.chunk_ready.connect(self.apply_scan_chunk)
+        _scan_Worker.usage_progress.connect(self.apply_usage_progress)
+        _scan_Worker.finished.connect(self.scan_finished)
 
-                    filePath_abs = hou.expandString(filePath)
+        self.set_busy(True)
+        self.update_scan_status()
+        _scan_Worker.start()
 
-                    _asset_List.setRowCount(len(_all_Files_List_temp))
+    def apply_scan_chunk(self, chunk):
+        """
+        Receives (row, exists, missing frames) results from the 'ScanWorker' and updates icons and missing list.
+        """
+
+        global _amount_Missing_Textures
 
-                    filePath_item = QtWidgets.QTableWidgetItem()
-                    filePath_item.setText(filePath)
+        # Chunks of a cancelled scan may still be queued
+        if self.sender() != _scan_Worker:
+            return
 
-                    nodePath_item = QtWidgets.QTableWidgetItem()
-                    nodePath_item.setText(nodePath)
+        for index, exists, missing_frames in chunk:
+            _asset_Model.rows[index].missing = not exists
+            _asset_Model.rows[index].missing_frames = missing_frames
+            if not exists:
+                _missing_Textures_Index_List.append(index)
 
-                    is_sequence = re.search(r"[$]F", filePath)
-                    is_udim = re.search(r"<udim>", filePath)
+        _asset_Model.refresh()
+        _amount_Missing_Textures = len(_missing_Textures_Index_List)
+        self.scan_done += len(chunk)
+        self.update_scan_status()
 
-                    _all_Files_List[index] = [nodePath, filePath, parm, is_udim, is_sequence, index]
+    def apply_usage_progress(self, done, total):
+        if self.sender() != _scan_Worker:
+            return
 
-                    if is_udim != None:
-                        filePath_abs = filePath_abs.replace("<udim>", "1001")
-                    else:
-                        filePath_abs = hou.expandString(filePath)
+        _status.setText("Status: Sizing files - " + str(done) + " / " + str(total) + " | " + "Missing - " + str(_amount_Missing_Textures))
 
-                    filePath_abs_item = QtWidgets.QTableWidgetItem()
-                    filePath_abs_item.setText(filePath_abs)
+    def update_scan_status(self):
+        status_text = "Status: Checking files - " + str(self.scan_done) + " / " + str(self.scan_total) + " | " + "Missing - " + str(_amount_Missing_Textures)
+        _status.setText(status_text)
+
+    def scan_finished(self):
+        """
+        Called when the 'ScanWorker' is done.
+        """
 
-                    _asset_List.setItem(index, 0, filePath_item)
-                    _asset_List.setItem(index, 2, filePath_abs_item)
-                    _asset_List.setItem(index, 3, nodePath_item)
+        if self.sender() == _scan_Worker:
+            self.finish_scan(False)
 
-                    if not os.path.exists(filePath_abs):
-                        _amount_Missing_Textures += 1
-                        _missing_Textures_Index_List.append(index)
-                        filePath_item.setIcon(QtGui.QIcon(missing_Icon))
-                    else:
-                        filePath_item.setIcon(QtGui.QIcon(found_Icon))
+    def finish_scan(self, cancelled):
+        global _scan_Worker
 
-        status_text = "Status: Found - " + str(len(_all_Files_List)) + " | " + "Missing - " + str(_amount_Missing_Textures) + " | "
+        usage = _scan_Worker.usage
+        _scan_Worker.deleteLater()
+        _scan_Worker = None
+        _missing_Textures_Index_List.sort()
+        self.set_busy(False)
+        self.watch_rows()
+
+        status_text = "Status: Found - " + str(len(_asset_Model.rows)) + " | " + "Missing - " + str(_amount_Missing_Textures) + " | "
+        if cancelled:
+            status_text += "Scan cancelled after " + str(self.scan_done) + " / " + str(self.scan_total) + " files!"
+            _status.setToolTip("")
+        elif usage != None:
+            status_text += usage.summary_text()
+            _status.setToolTip("Projected archive: " + format_size(usage.archive_size(hou.hipFile.path())) + "\n\n" +
+                               usage.details_text())
 
         _status.setText(status_text)
 
+    def cancel_scan(self):
+        """
+        Stop a running scene scan. Rows that were not checked yet show no icon.
+        """
+
+        if _scan_Worker != None:
+            _scan_Worker.cancel()
+            _scan_Worker.wait()
+            self.finish_scan(True)
+
+    def is_scanning(self):
+        return _scan_Worker != None
+
+    def is_copying(self):
+        return _copy_Engine != None
+
+    def set_busy(self, busy):
+        """
+        Show the cancel button and block actions that change rows while a scan or copy is running.
+        A scene reload is only blocked while copying, it cancels a running scan.
+        """
+
+        _cancel_B.setVisible(busy)
+        _relink_B.setEnabled(not busy)
+        _copy_B.setEnabled(not busy)
+        _cache_B.setEnabled(not busy)
+        _make_archive_B.setEnabled(not busy)
+        _reload_B.setEnabled(not self.is_copying())
+
     def missing_texture_count(self):
-        for row in range(_asset_List.rowCount()):
-            pass
+        """
+        Recompute '_missing_Textures_Index_List' and the row icons from the real paths.
+        Rows are grouped by directory and each directory is listed once instead of
+        stat'ing every file. Returns the 'DirectoryListing' that was used.
+        """
+
+        global _missing_Textures_Index_List
+        global _amount_Missing_Textures
+
+        _missing_Textures_Index_List, listing = check_rows(_asset_Model.rows, _workers_SB.value())
+
+        _amount_Missing_Textures = len(_missing_Textures_Index_List)
+        _asset_Model.refresh()
+        self.watch_rows()
+
+        return listing
+
+    def watch_rows(self):
+        """
+        Watch the directories of all rows, see 'AssetWatcher'.
+        """
+
+        _asset_Watcher.watch([(index, self.convert_backslash(row.real_path), row.sequence) for index, row in enumerate(_asset_Model.rows)])
+
+    def apply_watch_chunk(self, chunk):
+        """
+        Receives (row, exists, missing frames) results from the 'AssetWatcher' and updates only the rows whose status changed.
+        """
+
+        global _missing_Textures_Index_List
+        global _amount_Missing_Textures
+
+        # Row positions change while scanning and real paths while copying, they are watched again afterwards
+        if self.is_scanning():
+            return
+
+        if self.is_copying():
+            self.watch_dropped.update(index for index, exists, missing_frames in chunk)
+            return
+
+        changed = []
+        for index, exists, missing_frames in chunk:
+            if index >= len(_asset_Model.rows):
+                continue
+
+            row = _asset_Model.rows[index]
+            if row.missing == exists or row.missing_frames != missing_frames:
+                row.missing = not exists
+                row.missing_frames = missing_frames
+                changed.append(index)
+
+        if not changed:
+            return
+
+        _missing_Textures_Index_List = [index for index, row in enumerate(_asset_Model.rows) if row.missing]
+        _amount_Missing_Textures = len(_missing_Textures_Index_List)
+        _asset_Model.refresh(changed)
+
+        status_text = "Status: Found - " + str(len(_asset_Model.rows)) + " | " + "Missing - " + str(_amount_Missing_Textures)
+        _status.setText(status_text)
 
     def relink_paths(self):
         """
         Search the provided directory and all subdirectories and replace files.
+        The search directory is looked up in the persistent 'IndexDatabase', which only
+        relists directories that changed since the last relink. Rows are then resolved by lookup.
+        Several search directories can be given separated by ';'. They are searched in order,
+        each only for the rows that are still unresolved, and later ones aren't crawled at all
+        once every row is resolved. With fuzzy relink, rows without an exact match in any
+        directory take the most similar file name, again in directory order.
+        Rows found at a path of the path map are moved there first, without a search.
         """
-        global _amount_Missing_Textures
-        global _missing_Textures_Index_List
-        global _only_missing_CB
         global _amount_files_relinked
 
-        _amount_Missing_Textures = 0
         _amount_files_relinked = 0
 
-        search_Path = self.convert_backslash(hou.expandString(_search_Path.text()))
-
-        if QtGui.QGuiApplication.keyboardModifiers() == QtCore.Qt.ShiftModifier:
-            preview = False
-            sel_Items = _asset_List.selectedItems()
-            sel_row_list = []
-
-            for item in sel_Items:
-                sel_row_list.append(item.row())
-
-            for root, dirs, files in os.walk(search_Path):
-                if _only_missing_CB.isChecked() == True:
-                    for index in _missing_Textures_Index_List:
-                        if index in sel_row_list:
-                            self.relink_path(index, root, preview)
-                elif _only_missing_CB.isChecked() == False:
-                    for i in range(_asset_List.rowCount()):
-                        if i in sel_row_list:
-                            self.relink_path(i, root, preview)
-
-            _missing_Textures_Index_List = []
-            for i in range(_asset_List.rowCount()):
-            # Updates the missing textures index list after deleting entries
-                item_Path = _asset_List.item(i, 2).text()
-                if not os.path.exists(item_Path):
-                    _amount_Missing_Textures += 1
-                    _missing_Textures_Index_List.append(i)
-
-        elif QtGui.QGuiApplication.keyboardModifiers() == (QtCore.Qt.ControlModifier | QtCore.Qt.ShiftModifier):
-            preview = True
-            sel_Items = _asset_List.selectedItems()
-            sel_row_list = []
-
-            for item in sel_Items:
-                sel_row_list.append(item.row())
-
-            for root, dirs, files in os.walk(search_Path):
-                if _only_missing_CB.isChecked() == True:
-                    for index in _missing_Textures_Index_List:
-                        if index in sel_row_list:
-                            self.relink_path(index, root, preview)
-                elif _only_missing_CB.isChecked() == False:
-                    for i in range(_asset_List.rowCount()):
-                        if i in sel_row_list:
-                            self.relink_path(i, root, preview)
-        
-        elif QtGui.QGuiApplication.keyboardModifiers() == QtCore.Qt.ControlModifier:
-            preview = True
-            for root, dirs, files in os.walk(search_Path):
-                if _only_missing_CB.isChecked() == True:
-                    for index in _missing_Textures_Index_List:
-                        self.relink_path(index, root, preview)
-                elif _only_missing_CB.isChecked() == False:
-                    for i in range(_asset_List.rowCount()):
-                        self.relink_path(i, root, preview)
+        modifiers = QtGui.QGuiApplication.keyboardModifiers()
+        preview = modifiers in (QtCore.Qt.ControlModifier, QtCore.Qt.ControlModifier | QtCore.Qt.ShiftModifier)
+        selected_only = modifiers in (QtCore.Qt.ShiftModifier, QtCore.Qt.ControlModifier | QtCore.Qt.ShiftModifier)
 
+        if _only_missing_CB.isChecked() == True:
+            rows = list(_missing_Textures_Index_List)
         else:
-            preview = False
-
-            for root, dirs, files in os.walk(search_Path):
-                if _only_missing_CB.isChecked() == True:
-                    for index in _missing_Textures_Index_List:
-                        self.relink_path(index, root, preview)
-                elif _only_missing_CB.isChecked() == False:
-                    for i in range(_asset_List.rowCount()):
-                        self.relink_path(i, root, preview)
-
-            _missing_Textures_Index_List = []
-            for i in range(_asset_List.rowCount()):
-            # Updates the missing textures index list after deleting entries
-                item_Path = _asset_List.item(i, 2).text()
-                if not os.path.exists(item_Path):
-                    _amount_Missing_Textures += 1
-                    _missing_Textures_Index_List.append(i)
-
-        status_text = "Status: Found - " + str(len(_all_Files_List)) + " | " + "Missing - " + str(_amount_Missing_Textures) + " | " + str(_amount_files_relinked) + " Files relinked!"
+            rows = list(range(len(_asset_Model.rows)))
 
-        _status.setText(status_text)
+        if selected_only:
+            sel_row_list = set(self.selected_rows())
+            rows = [i for i in rows if i in sel_row_list]
 
-    def relink_path(self, index, root, preview):
-        global _amount_Missing_Textures
+        mapped = []
+        if preview == False:
+            if selected_only:
+                mapped = apply_path_mapping(_asset_Model.rows[i] for i in sorted(sel_row_list))
+            else:
+                mapped = apply_path_mapping(_asset_Model.rows)
 
-        current_Path = _all_Files_List[index][1]
-        current_Path_Abs = hou.expandString(current_Path)
-        get_var = _search_Path.text().encode("utf-8")
+        # Variables may have changed since the scan
+        expand_cache.refresh()
 
-        if _all_Files_List[index][3] != None:
-            current_Path_Abs = current_Path_Abs.replace("<udim>", "1001")
+        search_Paths = split_search_paths(_search_Path.text())
+        search_Indexes = []
+        relinked = []
 
-        if _all_Files_List[index][4] != None:
-            find_frame_var = re.findall(r"[$]F\d*", current_Path)
+        for fuzzy in (False, True):
+            if fuzzy and not _fuzzy_Relink_CB.isChecked():
+                break
 
-            if find_frame_var:
-                determine_frame_length = find_frame_var[0][-1]
+            for root, search_Path in enumerate(search_Paths):
+                if not rows:
+                    break
 
-            try:
-                if type(int(determine_frame_length)).__name__ == "int":
-                    frame_length = int(determine_frame_length)
-                else:
-                    frame_length = 0
-            except:
-                frame_length = 0
+                if root == len(search_Indexes):
+                    search_Indexes.append(build_search_index(self.convert_backslash(expand_string(search_Path)), index_path, _workers_SB.value()))
 
-        getVariable = current_Path.split("/")[0]
+                search_Index = search_Indexes[root]
+                fuzzy_Index = FuzzyIndex(search_Index) if fuzzy else None
 
-        filePath = root + "/" + current_Path_Abs.split("/")[-1]
-        filePath = self.convert_backslash(filePath)
+                found = set(i for i in rows if self.relink_path(i, search_Index, search_Path, preview, fuzzy_Index))
+                relinked.extend(i for i in rows if i in found)
+                rows = [i for i in rows if i not in found]
 
-        if os.path.exists(filePath):
-            global _amount_files_relinked
-            _amount_files_relinked += 1
+        if preview == False:
+            # One undo step and one cook for the whole relink
+            set_parms(row_writes(mapped + [_asset_Model.rows[i] for i in relinked]), "Asset Checker: Relink")
 
-            file_path_abs = filePath
-            if getVariable[0] == "$":
-                    expand_var = hou.expandString(getVariable)
-                    filePath = filePath.replace(expand_var, getVariable)
+        _asset_Model.refresh()
 
-            if _all_Files_List[index][3] != None:
-                filePath = filePath.replace("1001", "<udim>")
+        if preview == False:
+            # Updates the missing textures index list after relinking
+            self.missing_texture_count()
 
-            if _all_Files_List[index][4] != None:
-                if frame_length > 0:
-                    filePath = filePath.replace(str(1).rjust(frame_length, '0'), find_frame_var[0].encode("utf-8"))
-                else:
-                    filePath = filePath.replace(str(1), "$F")
+        status_text = "Status: Found - " + str(len(_asset_Model.rows)) + " | " + "Missing - " + str(_amount_Missing_Textures) + " | " + str(_amount_files_relinked) + " Files relinked!"
+        if mapped:
+            status_text += " | " + str(len(mapped)) + " Files mapped!"
 
-            if get_var[0] == "$":
-                expand_var = self.convert_backslash(hou.expandString(get_var))
-                filePath = filePath.replace(expand_var, get_var)
+        _status.setText(status_text)
 
-            new_path_item = QtWidgets.QTableWidgetItem()
-            new_path_item.setText(filePath)
-            
+    def relink_path(self, index, search_Index, search_Path, preview, fuzzy_Index=None):
+        """
+        Look up the file name of a row in 'search_Index' of the directory 'search_Path' and relink
+        the row to the first match. UDIM and frame tokens are kept in the new path.
+        Returns True if the row was relinked, its parm is written by 'relink_paths'.
+        """
+        global _amount_files_relinked
 
-            if preview == False:
-                _asset_List.setItem(index, 0, new_path_item)
-                new_path_abs_item = QtWidgets.QTableWidgetItem()
-                new_path_abs_item.setText(file_path_abs)
-                _asset_List.setItem(index, 2, new_path_abs_item)
+        if relink_row(_asset_Model.rows[index], search_Index, search_Path, preview, fuzzy_Index):
+            _amount_files_relinked += 1
+            return True
 
-                _asset_List.item(index, 0).setIcon(QtGui.QIcon(found_Icon))
+        return False
 
-                _all_Files_List[index][2].set(filePath)
-            else:
-                _asset_List.setItem(index, 1, new_path_item)
+    def asset_subdirs(self):
+        return (_texPath_input.text(), _geoPath_input.text(), _simPath_input.text())
 
-    def copy_file_to_hip(self, file_path, last_segment, index, archive_path):
-        global _variable_Name
-        global _amount_files_copied
+    def copy_files(self, index, listing, engine):
+        """
+        Schedule the file(s) of a row into the tex, geo and sim folders of the target.
+        """
 
-        if archive_path != "":
-            var_path = archive_path
+        schedule_copy(engine, index, _asset_Model.rows[index], listing, resolve_variable(_variable_Name.text()),
+                      _variable_Name.text(), self.asset_subdirs())
 
-        else:
-            if _variable_Name:
-                var_path = hou.getenv(_variable_Name.text().replace("$", ""))
-                if var_path == None:
-                    var_path = self.convert_backslash(_variable_Name.text())
+    def copy_files_button(self):
+        rows = list(range(len(_asset_Model.rows)))
 
-        tex_path = var_path + "/" + self.convert_backslash(_texPath_input.text())
-        geo_path = var_path + "/" + self.convert_backslash(_geoPath_input.text())
-        sim_path = var_path + "/" + self.convert_backslash(_simPath_input.text())
+        if QtGui.QGuiApplication.keyboardModifiers() == QtCore.Qt.ShiftModifier:
+            rows = self.selected_rows()
 
-        if not os.path.exists(tex_path):
-            os.makedirs(tex_path)
-        
-        if not os.path.exists(geo_path):
-            os.makedirs(geo_path)
+        listing = self.list_row_directories(rows)
+        engine = CopyEngine(_workers_SB.value(), mode=self.collect_mode())
 
-        if not os.path.exists(sim_path):
-            os.makedirs(sim_path)
+        for index in rows:
+            self.copy_files(index, listing, engine)
 
-        if file_path.endswith(tex_extensions):
-            dest_path = tex_path
-            subdir = _texPath_input.text()
+        self.start_copy(engine, "Files copied to: " + self.convert_backslash(expand_string(_variable_Name.text())))
 
-        elif file_path.endswith(geo_extensions):
-            dest_path = geo_path
-            subdir = _geoPath_input.text()
+    def cache_files(self):
+        """
+        Pull the files of all rows into the local cache and point their parms at '$ASSET_CACHE'.
+        Files cached with the same size and mtime as their source are skipped. With Shift,
+        cached parms are pointed back at their sources.
+        """
 
-        elif file_path.endswith(sim_extensions):
-            dest_path = sim_path
-            subdir = _simPath_input.text()
+        if QtGui.QGuiApplication.keyboardModifiers() == QtCore.Qt.ShiftModifier:
+            self.uncache_files()
+            return
+
+        cache_root = self.convert_backslash(expand_string(_cache_Path.text().strip()))
+        if cache_root == "":
+            hou.ui.displayMessage("Set a cache directory in the config first.",
+                                  severity=hou.severityType.Warning,
+                                  title="Asset Checker")
+            return
 
         try:
-            shutil.copy(file_path, dest_path)
-            new_path = _variable_Name.text() + "/" + subdir + "/" + last_segment
-            _asset_List.item(index, 0).setText(new_path)
-            _all_Files_List[index][2].set(new_path)
-            _amount_files_copied += 1
-        except:
-            pass
-
-    def copy_files(self, index, archive_path):
-        source_path = _asset_List.item(index, 0).text()
-        source_path_abs = hou.expandString(source_path)
-
-        if _all_Files_List[index][3] != None:
-            i = 1001
-            source_path_abs = source_path_abs.replace("<udim>", str(i))
-            while True:
-                source_path_abs = source_path_abs.replace(str(i-1), str(i))
-                get_last_segment = source_path_abs.split("/")[-1]
-                get_last_segment = get_last_segment.replace(str(i), "<udim>")
-
-                if i == 1010:
-                    break
+            cache = AssetCache(cache_root, _cache_Size_SB.value() * 1024 ** 3)
+        except OSError as e:
+            hou.ui.displayMessage("The cache directory could not be created.",
+                                  severity=hou.severityType.Warning,
+                                  details=str(e),
+                                  title="Asset Checker")
+            return
 
-                if not os.path.exists(source_path_abs):
-                    break
+        set_cache_variable(cache.root)
 
-                self.copy_file_to_hip(source_path_abs, get_last_segment, index, archive_path)
-                
-                i += 1
+        rows = list(range(len(_asset_Model.rows)))
+        listing = self.list_row_directories(rows)
+        engine = CopyEngine(_workers_SB.value(), cache, True)
 
-        elif _all_Files_List[index][4] != None:
-            get_last_segment = source_path.split("/")[-1]
-            get_first_segments_abs = source_path_abs.split("/")[:-1]
-            get_first_segments_abs = "/".join(get_first_segments_abs)
-            combine_paths = get_first_segments_abs + "/" + get_last_segment
+        for index in rows:
+            schedule_cache(engine, index, _asset_Model.rows[index], listing, cache)
 
-            find_frame_var = re.findall(r"[$]F\d*", combine_paths)
-            if find_frame_var:
-                index_pos = combine_paths.index(find_frame_var[0])
-                determine_frame_length = find_frame_var[0][-1]
+        # Evict before copying, so the cache doesn't run over its cap while it's filled
+        try:
+            cache.make_room(engine)
+        except IOError as e:
+            engine.errors.append((cache.path, str(e)))
 
-            try:
-                if type(int(determine_frame_length)).__name__ == "int":
-                    frame_length = int(determine_frame_length)
-                else:
-                    frame_length = 0
-            except:
-                frame_length = 0
+        self.start_copy(engine, "Files cached in: " + cache.root)
 
-            if frame_length > 1:
-                i = 1
-                variable = find_frame_var[0].encode("utf-8")
-                while True:
-                    source_path_abs = combine_paths.replace(variable, str(i).rjust(frame_length, '0'))
-                    if not os.path.exists(source_path_abs):
-                        break
+    def uncache_files(self):
+        """
+        Point the parms of cached rows back at the paths they had before caching, in a single undo step.
+        """
 
-                    self.copy_file_to_hip(source_path_abs, get_last_segment, index, archive_path)
+        uncached = uncache_rows(_asset_Model.rows)
+        set_parms(row_writes(uncached), "Asset Checker: Uncache")
 
-                    i += 1
+        if uncached:
+            self.parse_scene()
 
-            else:
-                i = 1
-                while True:
-                    source_path_abs = combine_paths.replace("$F", str(i))
-                    
-                    if not os.path.exists(source_path_abs):
-                        break
+    def make_archive(self):
+        if QtGui.QGuiApplication.keyboardModifiers() == QtCore.Qt.AltModifier:
+            self.verify_archive()
+            return
 
-                    self.copy_file_to_hip(source_path_abs, get_last_segment, index, archive_path)
+        if QtGui.QGuiApplication.keyboardModifiers() == QtCore.Qt.ControlModifier:
+            self.show_archive_usage()
+            return
 
-                    i += 1
-        else:
-            if os.path.exists(source_path_abs):
-                get_last_segment = source_path_abs.split("/")[-1]
+        if self.archive_format() != "folder":
+            self.make_container_archive(self.archive_format())
+            return
 
-                self.copy_file_to_hip(source_path_abs, get_last_segment, index, archive_path)
+        archive_destination = QtWidgets.QFileDialog.getExistingDirectory()
 
-    def copy_files_button(self):
+        if archive_destination != "":
+            rows = list(range(len(_asset_Model.rows)))
+            listing = self.list_row_directories(rows)
+
+            if not self.confirm_archive_size(rows, listing, archive_destination):
+                return
+
+            # The manifest is always written, so any archive can be updated incrementally later
+            manifest = ArchiveManifest(archive_destination, _checksum_CB.isChecked())
+            # Symlinks would leave the archive pointing back at the sources
+            mode = self.collect_mode()
+            if mode == SYMLINK:
+                mode = COPY
+
+            # An archive into the same folder that didn't finish is continued from its journal
+            journal = ArchiveJournal(archive_destination)
+            engine = CopyEngine(_workers_SB.value(), manifest, _incremental_CB.isChecked(), mode, journal)
+
+            # Like 'hython -m asset_checker archive', so both produce the same archive
+            schedule_archive(engine, _asset_Model.rows, listing, archive_destination, _variable_Name.text(),
+                             self.asset_subdirs())
+
+            done_text = "Files archived to: " + archive_destination
+            if journal.resuming():
+                done_text += " (resumed)"
+
+            self.start_copy(engine, done_text)
+
+    def make_container_archive(self, archive_format):
+        """
+        Stream all files and a copy of the scene into a single tar or zip file.
+        The archived scene points at the files relative to '$HIP', the session keeps its paths.
+        """
+
+        hip_file = hou.hipFile.path()
+        archive_path = QtWidgets.QFileDialog.getSaveFileName(self, "Make Archive",
+                                                             os.path.splitext(hip_file)[0] + "." + archive_format,
+                                                             "*." + archive_format)[0]
+        if archive_path == "":
+            return
+
+        if not archive_path.endswith("." + archive_format):
+            archive_path += "." + archive_format
+
+        rows = list(range(len(_asset_Model.rows)))
+        listing = self.list_row_directories(rows)
+
+        if not self.confirm_archive_size(rows, listing, os.path.dirname(archive_path)):
+            return
+
+        engine = ContainerEngine(archive_path, archive_format)
+
+        self.archive_temp_dir = tempfile.mkdtemp(prefix="asset_checker_")
+        schedule_archive(engine, _asset_Model.rows, listing, archive_path, _variable_Name.text(),
+                         self.asset_subdirs(), self.archive_temp_dir + "/" + os.path.basename(hip_file))
+
+        self.start_copy(engine, "Files archived to: " + archive_path)
+
+    def archive_usage(self, rows, listing, destination):
+        """
+        'DiskUsage' of rows (positions), the projected size of their archive and the free bytes at 'destination'.
+        """
+
+        usage = DiskUsage([_asset_Model.rows[index] for index in rows], listing, _workers_SB.value())
+
+        return usage, usage.archive_size(hou.hipFile.path()), free_space(destination)
+
+    def confirm_archive_size(self, rows, listing, destination):
+        """
+        Ask before archiving when the projected archive doesn't fit into the free space at 'destination'.
+        Returns False if the archive is cancelled.
+        """
+
+        usage, projected, free = self.archive_usage(rows, listing, destination)
+        if free == None or projected <= free:
+            return True
+
+        choice = hou.ui.displayMessage("The archive needs about " + format_size(projected) + ", but only " +
+                                       format_size(free) + " are free at " + destination + ".",
+                                       buttons=("Archive Anyway", "Cancel"),
+                                       severity=hou.severityType.Warning,
+                                       default_choice=1,
+                                       close_choice=1,
+                                       details=usage.details_text(),
+                                       title="Asset Checker")
+        return choice == 0
+
+    def show_archive_usage(self):
+        """
+        Show the projected archive size and the free space at a destination without archiving.
+        """
+
+        destination = QtWidgets.QFileDialog.getExistingDirectory(self, "Archive Destination")
+        if destination == "":
+            return
+
+        rows = list(range(len(_asset_Model.rows)))
+        usage, projected, free = self.archive_usage(rows, self.list_row_directories(rows), destination)
+
+        text = "Projected archive: " + format_size(projected)
+        if free != None:
+            text += " | Free at destination: " + format_size(free)
+
+        _status.setText("Status: " + text)
+
+        hou.ui.displayMessage(text,
+                              severity=hou.severityType.Message if free == None or projected <= free else hou.severityType.Warning,
+                              details=usage.details_text(),
+                              title="Asset Checker")
+
+    def start_copy(self, engine, done_text):
+        """
+        Run a 'CopyEngine' in the background. Progress, throughput and ETA are shown in the status bar.
+        """
+
+        global _copy_Engine
         global _amount_files_copied
+
         _amount_files_copied = 0
+        _copy_Engine = engine
 
-        if QtGui.QGuiApplication.keyboardModifiers() == QtCore.Qt.ShiftModifier:
-            sel_Items = _asset_List.selectedItems()
-            sel_row_list = []
+        self.copy_done_text = done_text
+        self.copied_rows = set()
+        self.parm_writes = []
+
+        self.set_busy(True)
+        engine.start()
+        self.copy_timer.start()
+        self.update_copy()
+
+    def update_copy(self):
+        """
+        Relink the rows of finished files on the main thread and update the status bar.
+        Their parms are written at once when the copy is done, see 'finish_copy'.
+        """
+
+        global _amount_files_copied
+
+        if _copy_Engine == None:
+            return
+
+        # Checked before draining, so no file can finish unseen after the last drain
+        running = _copy_Engine.is_running()
+        relinked = []
 
-            for item in sel_Items:
-                sel_row_list.append(item.row())
+        for job, error in _copy_Engine.finished_jobs():
+            if error != None or not job.data:
+                continue
 
-            for index in range(_asset_List.rowCount()):
-                if index in sel_row_list:
-                    self.copy_files(index, "")
+            if not job.skipped:
+                _amount_files_copied += 1
 
+            if not _copy_Engine.relink_rows:
+                continue
+
+            for index, new_path in job.data:
+                if index not in self.copied_rows:
+                    self.copied_rows.add(index)
+                    row = _asset_Model.rows[index]
+                    row.path = new_path
+                    row.real_path = expand_real_path(new_path)
+                    self.parm_writes.append((row.parm, new_path))
+                    relinked.append(index)
+
+        if relinked:
+            _asset_Model.refresh(relinked)
+
+        if running:
+            _status.setText("Status: " + _copy_Engine.status_text())
         else:
-            for index in range(_asset_List.rowCount()):
-                self.copy_files(index, "")
+            self.finish_copy()
+
+    def finish_copy(self):
+        global _copy_Engine
+
+        engine = _copy_Engine
+        _copy_Engine = None
+
+        self.copy_timer.stop()
+        self.set_busy(False)
+
+        # One undo step and one cook for all copied files, also when the copy was cancelled
+        set_parms(self.parm_writes, "Asset Checker: Copy")
+        self.parm_writes = []
+
+        if self.archive_temp_dir != None:
+            shutil.rmtree(self.archive_temp_dir, ignore_errors=True)
+            self.archive_temp_dir = None
 
         status_text = "Status: Found - " + \
-                      str(len(_all_Files_List)) + \
+                      str(len(_asset_Model.rows)) + \
                       " | " + \
                       "Missing - " + \
                       str(_amount_Missing_Textures) + \
                       " | " + \
                       str(_amount_files_copied) + \
-                      " Files copied to: " + \
-                      self.convert_backslash(hou.expandString(_variable_Name.text()))
+                      " " + \
+                      self.copy_done_text
 
-        _status.setText(status_text)
+        if engine.files_linked:
+            status_text += " | " + str(engine.files_linked) + " linked"
 
-    def make_archive(self):
-        archive_destination = QtWidgets.QFileDialog.getExistingDirectory()
-        hip_file = hou.hipFile.path()
+        if engine.files_skipped:
+            status_text += " | " + str(engine.files_skipped) + " unchanged"
 
-        if archive_destination != "":
-            for index in range(_asset_List.rowCount()):
-                self.copy_files(index, archive_destination)
+        if engine.cancelled:
+            status_text += " | Copy cancelled!"
 
+        if engine.manifest != None:
             try:
-                shutil.copy(hip_file, archive_destination)
-            except:
-                pass        
+                engine.manifest.save()
+            except (IOError, OSError) as e:
+                engine.errors.append((engine.manifest.path, str(e)))
+
+        engine.close_journal()
+
+        # Relinked rows are watched at their new paths, rows changed meanwhile are checked again
+        self.watch_rows()
+        _asset_Watcher.recheck_rows(self.watch_dropped | self.copied_rows)
+        self.watch_dropped = set()
+
+        _status.setText(status_text)
+
+        if engine.errors:
+            details = "\n".join(source + ": " + error for source, error in engine.errors)
+            hou.ui.displayMessage(str(len(engine.errors)) + " file(s) could not be copied.",
+                                  severity=hou.severityType.Warning,
+                                  details=details,
+                                  title="Asset Checker")
+
+    def verify_archive(self):
+        """
+        Re-hash an archive folder or container in the background and compare it with the checksums of its manifest.
+        """
+
+        global _archive_Verifier
+
+        if self.is_verifying():
+            return
+
+        if self.archive_format() == "folder":
+            archive_path = QtWidgets.QFileDialog.getExistingDirectory(self, "Verify Archive")
+        else:
+            archive_path = QtWidgets.QFileDialog.getOpenFileName(self, "Verify Archive", "",
+                                                                 "Archives (*.tar *.tar.gz *.tar.zst *.zip)")[0]
+
+        if archive_path == "":
+            return
+
+        _archive_Verifier = ArchiveVerifier(archive_path, _workers_SB.value())
+
+        self.verify_thread = threading.Thread(target=_archive_Verifier.run, name="asset_checker_verify")
+        self.verify_thread.daemon = True
+        self.verify_thread.start()
+
+        self.set_busy(True)
+        self.verify_timer.start()
+        self.update_verify()
+
+    def update_verify(self):
+        if _archive_Verifier == None:
+            return
+
+        if self.verify_thread.is_alive():
+            _status.setText("Status: " + _archive_Verifier.status_text())
+        else:
+            self.finish_verify()
+
+    def finish_verify(self):
+        global _archive_Verifier
+
+        verifier = _archive_Verifier
+        _archive_Verifier = None
+
+        self.verify_timer.stop()
+        self.set_busy(False)
+
+        report = verifier.report()
+        status_text = "Status: Verified " + str(report["verified"]) + " / " + str(report["files"]) + " files of " + report["archive"]
+
+        if report["unchecked"]:
+            status_text += " | " + str(len(report["unchecked"])) + " without checksum"
+
+        if report["cancelled"]:
+            status_text += " | Verify cancelled!"
+
+        _status.setText(status_text)
+
+        problems = [key + ": checksum mismatch" for key in report["mismatched"]] + \
+                   [key + ": missing" for key in report["missing"]] + \
+                   [entry["file"] + ": " + entry["error"] for entry in report["errors"]]
+
+        if problems:
+            hou.ui.displayMessage(str(len(problems)) + " archived file(s) don't match the manifest.",
+                                  severity=hou.severityType.Warning,
+                                  details="\n".join(problems),
+                                  title="Asset Checker")
+        elif report["status"] == "unchecked":
+            hou.ui.displayMessage("The archive could not be verified, " + str(len(report["unchecked"])) + " of " +
+                                  str(report["files"]) + " file(s) were archived without checksums.",
+                                  severity=hou.severityType.Warning,
+                                  details="\n".join(report["unchecked"]),
+                                  title="Asset Checker")
+
+    def cancel_verify(self):
+        """
+        Stop a running verification, files not hashed yet are left out of the result.
+        """
+
+        if _archive_Verifier != None:
+            _archive_Verifier.cancel()
+            self.verify_thread.join()
+            self.update_verify()
+
+    def is_verifying(self):
+        return _archive_Verifier != None
+
+    def collect_mode(self):
+        """
+        'CopyEngine' mode of the collect combo box.
+        """
+
+        return collect_modes[max(0, _collect_Mode_CB.currentIndex())]
+
+    def archive_format(self):
+        """
+        'folder' or the container format of the archive combo box.
+        """
+
+        return archive_formats[max(0, _archive_Format_CB.currentIndex())]
+
+    def cancel_copy(self):
+        """
+        Stop a running copy. Files that are already copied stay relinked, partial files are removed.
+        """
+
+        if _copy_Engine != None:
+            _copy_Engine.cancel()
+            _copy_Engine.wait()
+            self.update_copy()
+
+    def list_row_directories(self, rows):
+        """
+        List the source directories of rows (positions) concurrently, see 'scene_assets.list_row_directories'.
+        """
+
+        expand_cache.refresh()
+
+        return list_row_directories([_asset_Model.rows[index] for index in rows], _workers_SB.value())
+
+    def fill_path_map_table(self, rules):
+        """
+        Show a list of [from, to] rules with an empty row at the end to add a new one.
+        """
+
+        _path_Map_Table.blockSignals(True)
+        _path_Map_Table.setRowCount(0)
+
+        for source, target in rules + [["", ""]]:
+            row = _path_Map_Table.rowCount()
+            _path_Map_Table.insertRow(row)
+            _path_Map_Table.setItem(row, 0, QtWidgets.QTableWidgetItem(source))
+            _path_Map_Table.setItem(row, 1, QtWidgets.QTableWidgetItem(target))
+
+        _path_Map_Table.blockSignals(False)
+
+    def update_path_mapping(self):
+        """
+        Rebuild the path map after a rule was edited, store it and rescan the scene with it.
+        Rules with an empty side are ignored until both sides are filled.
+        """
+
+        rules = []
+        for row in range(_path_Map_Table.rowCount()):
+            items = [_path_Map_Table.item(row, column) for column in (0, 1)]
+            rules.append([item.text() if item != None else "" for item in items])
+
+        self.path_mapping = PathMapping(rules)
+        self.settings.setValue("path_Mapping", json.dumps(self.path_mapping.to_list()))
+
+        # Remove cleared rows and keep a single empty row at the end
+        kept = [rule for rule in rules if rule[0] or rule[1]]
+        if kept + [["", ""]] != rules:
+            self.fill_path_map_table(kept)
+
+        if not self.is_copying():
+            self.parse_scene()
 
     def open_file_dialog(self):
+        """
+        Pick the search directory. With Shift it is added as the last of several search directories.
+        """
+
+        append = QtGui.QGuiApplication.keyboardModifiers() == QtCore.Qt.ShiftModifier
+
         selected_dir = QtWidgets.QFileDialog.getExistingDirectory()
-        _search_Path.setText(selected_dir)
+        if not selected_dir:
+            return
+
+        if append and _search_Path.text().strip():
+            _search_Path.setText("; ".join(split_search_paths(_search_Path.text()) + [selected_dir]))
+        else:
+            _search_Path.setText(selected_dir)
+
+    def selected_rows(self):
+        """
+        Positions in '_asset_Model.rows' of all selected rows.
+        """
+
+        return _asset_Model.row_ids(_asset_List.selectionModel().selectedIndexes())
 
-    def jump_to_node(self):
+    def jump_to_node(self, index):
         if QtGui.QGuiApplication.keyboardModifiers() == QtCore.Qt.AltModifier:
-            current_row = _asset_List.currentRow()
-            current_node_full = _asset_List.item(current_row, 3).text().encode("utf-8")
+            current_row = _asset_Model.rows[_asset_Model.row_id(index)]
+            current_node_full = current_row.node_path.encode("utf-8")
             current_node = "/".join(current_node_full.split("/")[:-1])
 
             get_network = hou.ui.curDesktop().paneTabOfType(hou.paneTabType.NetworkEditor)
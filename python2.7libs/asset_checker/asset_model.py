@@ -0,0 +1,170 @@
+from PySide2 import QtCore
+from PySide2 import QtGui
+
+
+class AssetModel(QtCore.QAbstractTableModel):
+    """
+    Table model over a plain list of 'scene_assets.AssetRow's.
+
+    Rows are addressed by their position in 'rows' everywhere in the Asset Checker.
+    'order' holds the positions that pass the filter, in the current sort order,
+    so only visible rows are ever turned into text or icons by the view.
+    """
+
+    headers = ("Path", "New Path", "Real Path", "Node", "Missing Frames")
+
+    def __init__(self, found_icon, missing_icon, parent=None):
+        super(AssetModel, self).__init__(parent)
+
+        self.found_icon = QtGui.QIcon(found_icon)
+        self.missing_icon = QtGui.QIcon(missing_icon)
+
+        self.rows = []
+        self.order = []
+        self.filter_text = ""
+        self.sort_column = None
+        self.sort_order = QtCore.Qt.AscendingOrder
+
+    # Qt interface
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.order)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.headers)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row = self.rows[self.order[index.row()]]
+
+        if role == QtCore.Qt.DisplayRole or role == QtCore.Qt.ToolTipRole:
+            return self.column_text(row, index.column())
+
+        if role == QtCore.Qt.DecorationRole and index.column() == 0:
+            if row.missing == True:
+                return self.missing_icon
+            elif row.missing == False:
+                return self.found_icon
+
+        return None
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        """
+        Sort the visible rows. A negative column restores the scene order.
+        """
+
+        self.beginResetModel()
+        self.sort_column = column if column >= 0 else None
+        self.sort_order = order
+        self._update_order()
+        self.endResetModel()
+
+    # Row store
+    def column_text(self, row, column):
+        if column == 0:
+            return row.path
+        elif column == 1:
+            return row.new_path or row.mapped_path
+        elif column == 2:
+            return row.real_path
+        elif column == 3:
+            return row.node_path
+        elif column == 4:
+            return row.missing_frames
+        return ""
+
+    def set_rows(self, rows):
+        """
+        Replace all rows.
+        """
+
+        self.beginResetModel()
+        self.rows = rows
+        self._update_order()
+        self.endResetModel()
+
+    def remove_rows(self, row_ids):
+        """
+        Remove rows by position. Positions of the remaining rows shift down.
+        """
+
+        row_ids = set(row_ids)
+        self.set_rows([row for i, row in enumerate(self.rows) if i not in row_ids])
+
+    def set_filter(self, text):
+        """
+        Only show rows whose path, real path or node contains 'text' (case insensitive).
+        """
+
+        self.beginResetModel()
+        self.filter_text = text.lower()
+        self._update_order()
+        self.endResetModel()
+
+    def refresh(self, row_ids=None):
+        """
+        Repaint rows after their values changed. Without 'row_ids' all rows are repainted.
+        """
+
+        if not self.order:
+            return
+
+        if row_ids == None:
+            first = 0
+            last = len(self.order) - 1
+        else:
+            row_ids = set(row_ids)
+            positions = [i for i, row_id in enumerate(self.order) if row_id in row_ids]
+            if not positions:
+                return
+            first = positions[0]
+            last = positions[-1]
+
+        self.dataChanged.emit(self.index(first, 0), self.index(last, self.columnCount() - 1))
+
+    def row_id(self, index):
+        """
+        Position in 'rows' of a view index.
+        """
+
+        return self.order[index.row()]
+
+    def row_ids(self, indexes):
+        """
+        Sorted, unique positions in 'rows' of a list of view indexes, e.g. a selection.
+        """
+
+        return sorted(set(self.order[index.row()] for index in indexes if index.isValid()))
+
+    def _update_order(self):
+        if self.filter_text:
+            text = self.filter_text
+            self.order = [i for i, row in enumerate(self.rows)
+                          if text in row.path.lower() or text in row.real_path.lower() or text in row.node_path.lower()]
+        else:
+            self.order = list(range(len(self.rows)))
+
+        if self.sort_column != None:
+            self._sort()
+
+    def _sort(self):
+        column = self.sort_column
+        rows = self.rows
+
+        if column == 0:
+            # Missing files first, then by path
+            key = lambda i: (rows[i].missing != True, rows[i].path.lower())
+        else:
+            key = lambda i: self.column_text(rows[i], column).lower()
+
+        self.order.sort(key=key, reverse=self.sort_order == QtCore.Qt.DescendingOrder)
@@ -0,0 +1,164 @@
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+
+from crawler import default_workers, map_threaded, walk
+
+scene_extensions = (".hip", ".hiplc", ".hipnc")
+
+package_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def default_hython():
+    """
+    The running hython, or 'hython' from the PATH when the batch runs in plain Python.
+    """
+
+    if os.path.basename(sys.executable).lower().startswith("hython"):
+        return sys.executable
+
+    return "hython"
+
+
+def find_scenes(root, workers=default_workers):
+    """
+    All scene files below 'root', without Houdini's 'backup' folders. Sorted.
+    """
+
+    scenes = []
+    for directory, dirs, files in walk(root, workers):
+        if "backup" in directory.split("/"):
+            continue
+
+        base = directory.rstrip("/") + "/"
+        scenes.extend(base + name for name in files if name.endswith(scene_extensions))
+
+    return sorted(scenes)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="hython -m asset_checker batch",
+                                     description="Audit all scenes below a project directory for missing assets "
+                                                 "with a pool of hython processes. Exits with 1 if files are missing.")
+
+    parser.add_argument("root", help="Project directory to search for .hip files.")
+    parser.add_argument("--processes", type=int, default=multiprocessing.cpu_count(),
+                        help="Scenes checked at the same time (default: amount of cores).")
+    parser.add_argument("--workers", type=int, default=4, help="Listing threads per process (default: 4).")
+    parser.add_argument("--include-out", action="store_true", help="Include references inside /out and ROP networks.")
+    parser.add_argument("--listing-cache", metavar="DB",
+                        help="Directory listing cache shared by all processes (default: a temporary file).")
+    parser.add_argument("--hython", default=default_hython(), help="hython executable (default: %(default)s).")
+    parser.add_argument("--report", default="-", help="Merged JSON report file, '-' for stdout (default).")
+
+    return parser.parse_args(argv)
+
+
+def audit_scene(hip, args, report_path):
+    """
+    Check a single scene in its own hython process. Returns its report, or a dict with an 'error'.
+    """
+
+    command = [args.hython, "-m", "asset_checker", hip,
+               "--rows", "--sizes",
+               "--workers", str(args.workers),
+               "--listing-cache", args.listing_cache,
+               "--report", report_path]
+    if args.include_out:
+        command.append("--include-out")
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = package_path + os.pathsep + env.get("PYTHONPATH", "")
+
+    process = subprocess.Popen(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = process.communicate()[0]
+
+    # 1 only means files are missing
+    if process.returncode not in (0, 1) or not os.path.isfile(report_path):
+        output = output.decode("utf-8", "replace") if isinstance(output, bytes) else output
+        return {"hip": hip, "error": "hython exited with " + str(process.returncode) + "\n" + output[-2000:]}
+
+    try:
+        with open(report_path, "r") as report_file:
+            return json.load(report_file)
+    finally:
+        os.remove(report_path)
+
+
+def merge_reports(reports):
+    """
+    Merge scene reports into missing files per scene, assets shared by several scenes and the total size.
+    Shared assets are only counted once in 'total_bytes'.
+    """
+
+    scenes = {}
+    asset_scenes = {}
+    asset_bytes = {}
+    missing_total = 0
+
+    for report in reports:
+        hip = report["hip"]
+
+        if "error" in report:
+            scenes[hip] = {"error": report["error"]}
+            continue
+
+        missing = sorted(set(row["path"] for row in report["missing"]))
+        missing_total += len(missing)
+
+        scenes[hip] = {"references": report["references"], "missing": missing}
+
+        for row in report.get("rows", []):
+            asset_scenes.setdefault(row["asset"], set()).add(hip)
+            asset_bytes[row["asset"]] = row["bytes"]
+
+    shared = dict((asset, sorted(hips)) for asset, hips in asset_scenes.items() if len(hips) > 1)
+
+    return {"scenes": scenes,
+            "scene_count": len(scenes),
+            "failed_scenes": sorted(hip for hip, scene in scenes.items() if "error" in scene),
+            "missing_total": missing_total,
+            "shared_assets": shared,
+            "asset_count": len(asset_bytes),
+            "total_bytes": sum(asset_bytes.values())}
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenes = find_scenes(args.root, args.workers)
+
+    temp_dir = tempfile.mkdtemp(prefix="asset_checker_batch_")
+    if not args.listing_cache:
+        args.listing_cache = os.path.join(temp_dir, "listings.db")
+
+    def audit(item):
+        index, hip = item
+        return audit_scene(hip, args, os.path.join(temp_dir, str(index) + ".json"))
+
+    reports = []
+    try:
+        for (index, hip), report, error in map_threaded(audit, enumerate(scenes), args.processes):
+            if error != None:
+                report = {"hip": hip, "error": str(error)}
+
+            reports.append(report)
+            sys.stderr.write("[" + str(len(reports)) + "/" + str(len(scenes)) + "] " + hip + "\n")
+    finally:
+        for name in os.listdir(temp_dir):
+            os.remove(os.path.join(temp_dir, name))
+        os.rmdir(temp_dir)
+
+    merged = merge_reports(reports)
+
+    text = json.dumps(merged, indent=1, sort_keys=True)
+    if args.report == "-":
+        sys.stdout.write(text + "\n")
+    else:
+        with open(args.report, "w") as report_file:
+            report_file.write(text)
+
+    return 1 if merged["missing_total"] or merged["failed_scenes"] else 0
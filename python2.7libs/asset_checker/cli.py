@@ -0,0 +1,340 @@
+import argparse
+import json
+import os
+import sys
+
+import hou
+
+from archive_container import ContainerEngine, container_formats
+from archive_journal import ArchiveJournal
+from archive_manifest import ArchiveManifest
+from archive_verify import ArchiveVerifier
+from asset_cache import AssetCache, default_cache_size
+from copy_engine import CopyEngine, COPY, SYMLINK, collect_modes
+from crawler import DirectoryListing, default_workers
+from disk_usage import DiskUsage, free_space
+from file_index import CachedDirectoryListing, FuzzyIndex
+from path_mapping import PathMapping
+from scene_assets import apply_path_mapping, build_search_index, check_rows, collect_rows, convert_backslash, \
+                         expand_real_path, expand_string, relink_row, resolve_variable, row_report, row_sizes, \
+                         row_writes, schedule_archive, schedule_cache, schedule_copy, set_cache_variable, set_parms, \
+                         split_search_paths, uncache_rows
+
+
+def default_index_path():
+    """
+    The relink index of the Asset Checker window, or one in the home directory outside of DMNK Tools.
+    """
+
+    dmnk_path = hou.getenv("dmnk")
+    if dmnk_path != None:
+        return dmnk_path + "/config/asset_checker_index.db"
+
+    return os.path.expanduser("~/.asset_checker_index.db")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="hython -m asset_checker",
+                                     description="Check, relink, collect or archive the files referenced by a .hip file. "
+                                                 "Exits with 1 if files are still missing or could not be copied.")
+
+    parser.add_argument("hip", help="Scene to check.")
+    parser.add_argument("--include-out", action="store_true", help="Include references inside /out and ROP networks.")
+    parser.add_argument("--map", action="append", default=[], metavar="FROM=TO",
+                        help="Replace the path prefix FROM with TO, e.g. 'G:/Projects=/mnt/projects'. "
+                             "Can be given several times, the longest matching prefix wins.")
+    parser.add_argument("--relink", action="append", default=[], metavar="ROOT",
+                        help="Search ROOT for missing files. Can be given several times or ';' separated, roots are "
+                             "searched in order and only for files that are still missing.")
+    parser.add_argument("--fuzzy", nargs="?", type=float, const=0.6, metavar="SCORE",
+                        help="Relink renamed files to the most similar name when there is no exact match. "
+                             "SCORE is the minimum similarity from 0 to 1 (default: 0.6).")
+    parser.add_argument("--collect", metavar="TARGET",
+                        help="Copy all files into the tex, geo and sim folders of TARGET, e.g. '$HIP', and relink them.")
+    parser.add_argument("--archive", metavar="PATH", help="Archive all files and the scene into a folder or a tar / zip file.")
+    parser.add_argument("--format", choices=("folder",) + container_formats,
+                        help="Archive format. Defaults to the extension of PATH, or a folder.")
+    parser.add_argument("--cache", metavar="DIR",
+                        help="Pull all files into the local cache DIR and point the parms at $ASSET_CACHE. "
+                             "Files whose source didn't change since they were cached are skipped.")
+    parser.add_argument("--cache-size", type=float, default=default_cache_size / 1024.0 ** 3, metavar="GB",
+                        help="Size cap of the cache, least recently used files are evicted above it (default: 50).")
+    parser.add_argument("--uncache", action="store_true", help="Point cached parms back at their sources.")
+    parser.add_argument("--tex", default="tex", help="Texture folder name (default: tex).")
+    parser.add_argument("--geo", default="geo", help="Geometry folder name (default: geo).")
+    parser.add_argument("--sim", default="sim", help="Sim folder name (default: sim).")
+    parser.add_argument("--variable", default="$HIP", help="Variable the new parm paths start with (default: $HIP).")
+    parser.add_argument("--mode", choices=collect_modes, default=COPY, help="Collect files as copies or links.")
+    parser.add_argument("--incremental", action="store_true", help="Skip files that didn't change since the last archive.")
+    parser.add_argument("--checksum", action="store_true",
+                        help="Store checksums of archived files, computed while copying. Files whose mtime changed "
+                             "are compared by checksum on the next incremental archive.")
+    parser.add_argument("--verify", action="store_true",
+                        help="Re-hash the archive after writing it and report files that don't match. Implies --checksum.")
+    parser.add_argument("--workers", type=int, default=default_workers, help="Threads for listing and copying.")
+    parser.add_argument("--index", default=None, help="Relink index database.")
+    parser.add_argument("--listing-cache", metavar="DB",
+                        help="Directory listing cache, can be shared by several processes. Unchanged directories aren't listed again.")
+    parser.add_argument("--save", action="store_true", help="Save the scene after relinking or collecting.")
+    parser.add_argument("--rows", action="store_true", help="Add every reference to the report, not only missing ones.")
+    parser.add_argument("--sizes", action="store_true", help="Add the asset and size on disk of every reference to the report.")
+    parser.add_argument("--usage", action="store_true",
+                        help="Add the disk usage per category, node and directory to the report, with the projected "
+                             "archive size and the free space at the --archive, --collect or --cache target.")
+    parser.add_argument("--report", default="-", help="JSON report file, '-' for stdout (default).")
+
+    args = parser.parse_args(argv)
+
+    if len([option for option in (args.collect, args.archive, args.cache, args.uncache) if option]) > 1:
+        parser.error("only one of --collect, --archive, --cache and --uncache can be used")
+
+    for rule in args.map:
+        if "=" not in rule:
+            parser.error("--map needs FROM=TO, got '" + rule + "'")
+
+    if args.verify and not args.archive:
+        parser.error("--verify needs --archive")
+
+    if args.verify:
+        args.checksum = True
+
+    if args.archive and args.format == None:
+        args.format = "folder"
+        for container_format in container_formats:
+            if args.archive.endswith("." + container_format):
+                args.format = container_format
+
+    if args.index == None:
+        args.index = default_index_path()
+
+    return args
+
+
+def run_engine(engine, rows):
+    """
+    Run a copy or container engine to the end and relink the rows of finished files
+    in a single undo step. Returns the amount of copied files.
+    """
+
+    engine.start()
+    try:
+        engine.wait()
+    except KeyboardInterrupt:
+        engine.cancel()
+        engine.wait()
+
+    copied = 0
+    writes = []
+    for job, error in engine.finished_jobs():
+        if error != None or not job.data:
+            continue
+
+        if not job.skipped:
+            copied += 1
+
+        if engine.relink_rows:
+            for index, new_path in job.data:
+                if rows[index].path != new_path:
+                    rows[index].path = new_path
+                    rows[index].real_path = expand_real_path(new_path)
+                    writes.append((rows[index].parm, new_path))
+
+    set_parms(writes, "Asset Checker: Copy")
+
+    if engine.manifest != None:
+        engine.manifest.save()
+
+    engine.close_journal()
+
+    return copied
+
+
+def archive(args, rows, listing, subdirs):
+    """
+    Archive all rows and a copy of the scene with parms pointing into the archive, see 'schedule_archive'.
+    Returns the engine and temporary files to remove when it's done.
+    A folder archive that was interrupted is continued from its journal.
+    """
+
+    if args.format == "folder":
+        archive_path = convert_backslash(args.archive)
+        if not os.path.isdir(archive_path):
+            os.makedirs(archive_path)
+
+        # Symlinks would leave the archive pointing back at the sources
+        mode = args.mode if args.mode != SYMLINK else COPY
+        engine = CopyEngine(args.workers, ArchiveManifest(archive_path, args.checksum), args.incremental, mode,
+                            ArchiveJournal(archive_path))
+
+        schedule_archive(engine, rows, listing, archive_path, args.variable, subdirs)
+        return engine, []
+
+    # The scene is saved next to the archive and streamed into it
+    temp_hip = args.archive + "." + os.path.basename(hou.hipFile.path())
+    engine = ContainerEngine(args.archive, args.format)
+
+    schedule_archive(engine, rows, listing, args.archive, args.variable, subdirs, temp_hip)
+    return engine, [temp_hip]
+
+
+def run(args):
+    """
+    Load the scene, check, relink, collect or archive it and return the report as a dict.
+    """
+
+    hou.hipFile.load(args.hip, suppress_save_prompt=True, ignore_load_warnings=True)
+
+    path_mapping = PathMapping(rule.split("=", 1) for rule in args.map)
+    rows = collect_rows(args.include_out, path_mapping)
+
+    if args.listing_cache:
+        listing = CachedDirectoryListing(args.listing_cache, args.workers)
+    else:
+        listing = DirectoryListing(args.workers)
+
+    missing, listing = check_rows(rows, args.workers, listing)
+
+    report = {"hip": args.hip,
+              "references": len(rows),
+              "missing_before": len(missing),
+              "mapped": 0,
+              "relinked": 0,
+              "uncached": 0,
+              "copied": 0,
+              "skipped": 0,
+              "errors": []}
+
+    mapped = apply_path_mapping(rows)
+    report["mapped"] = len(mapped)
+
+    roots = [root for text in args.relink for root in split_search_paths(text)]
+    search_indexes = []
+    # Positions, a sequence still missing frames is searched and relinked again in later roots
+    relinked = set()
+
+    # Exact matches in any root win over fuzzy ones, so the fuzzy pass only runs after all roots were searched
+    for fuzzy in (False, True):
+        if fuzzy and args.fuzzy == None:
+            break
+
+        for i, root in enumerate(roots):
+            if not missing:
+                break
+
+            if i == len(search_indexes):
+                search_indexes.append(build_search_index(convert_backslash(expand_string(root)), args.index, args.workers))
+
+            fuzzy_index = FuzzyIndex(search_indexes[i], args.fuzzy) if fuzzy else None
+
+            found = [index for index in missing if relink_row(rows[index], search_indexes[i], root, fuzzy_index=fuzzy_index)]
+            relinked.update(found)
+
+            # Relinking doesn't change the disk, only the rows relinked from this root are checked again
+            still_missing, listing = check_rows([rows[index] for index in found], args.workers, listing)
+            resolved = set(found) - set(found[position] for position in still_missing)
+            missing = [index for index in missing if index not in resolved]
+
+    relinked_rows = [row for index, row in enumerate(rows) if index in relinked and row not in mapped]
+    set_parms(row_writes(mapped + relinked_rows), "Asset Checker: Relink")
+    report["relinked"] = len(relinked)
+
+    if args.usage:
+        # Measured before copying, with the sizes read by the existence checks
+        usage = DiskUsage(rows, listing, args.workers)
+        report["usage"] = usage.report()
+        report["usage"]["archive_bytes"] = usage.archive_size(hou.hipFile.path())
+
+        if args.archive:
+            target = args.archive if args.format == "folder" else os.path.dirname(os.path.abspath(args.archive))
+        elif args.collect:
+            target = resolve_variable(args.collect)
+        else:
+            target = args.cache
+
+        if target:
+            report["usage"]["target"] = target
+            report["usage"]["free_bytes"] = free_space(convert_backslash(expand_string(target)))
+
+    engine = None
+    temp_files = []
+    subdirs = (args.tex, args.geo, args.sim)
+
+    if args.uncache:
+        uncached = uncache_rows(rows)
+        set_parms(row_writes(uncached), "Asset Checker: Uncache")
+        report["uncached"] = len(uncached)
+
+        listing.invalidate()
+        missing, listing = check_rows(rows, args.workers, listing)
+
+    elif args.cache:
+        cache = AssetCache(convert_backslash(expand_string(args.cache)), int(args.cache_size * 1024 ** 3))
+        set_cache_variable(cache.root)
+        engine = CopyEngine(args.workers, cache, True)
+
+        for index, row in enumerate(rows):
+            schedule_cache(engine, index, row, listing, cache)
+
+        cache.make_room(engine)
+
+    elif args.collect:
+        engine = CopyEngine(args.workers, mode=args.mode)
+        target_path = resolve_variable(args.collect)
+
+        for index, row in enumerate(rows):
+            schedule_copy(engine, index, row, listing, target_path, args.collect, subdirs)
+
+    elif args.archive:
+        engine, temp_files = archive(args, rows, listing, subdirs)
+
+    if engine != None:
+        try:
+            report["copied"] = run_engine(engine, rows)
+        finally:
+            for temp_file in temp_files:
+                try:
+                    os.remove(temp_file)
+                except OSError:
+                    pass
+
+        report["skipped"] = engine.files_skipped
+        report["errors"] = [{"file": source, "error": error} for source, error in engine.errors]
+
+        if args.verify and not engine.cancelled:
+            verifier = ArchiveVerifier(args.archive, args.workers)
+            verifier.run()
+            report["verify"] = verifier.report()
+
+    if args.save and (report["mapped"] or report["relinked"] or report["uncached"] or args.collect or args.cache):
+        hou.hipFile.save()
+
+    row_reports = [row_report(row) for row in rows]
+
+    if args.sizes:
+        for entry, (asset, size) in zip(row_reports, row_sizes(rows, listing, args.workers)):
+            entry["asset"] = asset
+            entry["bytes"] = size
+
+    report["missing"] = [row_reports[index] for index in missing]
+    if args.rows:
+        report["rows"] = row_reports
+
+    return report
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+
+    text = json.dumps(report, indent=1, sort_keys=True)
+    if args.report == "-":
+        sys.stdout.write(text + "\n")
+    else:
+        with open(args.report, "w") as report_file:
+            report_file.write(text)
+
+    # Files that couldn't be verified fail the archive as well
+    if report.get("verify", {}).get("status", "ok") != "ok":
+        return 1
+
+    return 1 if report["missing"] or report["errors"] else 0
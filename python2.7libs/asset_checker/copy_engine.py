@@ -0,0 +1,538 @@
+import ctypes
+import errno
+import hashlib
+import os
+import shutil
+import sys
+import threading
+import time
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+from archive_journal import progress_interval
+from archive_manifest import UNCHANGED, VERIFY
+from crawler import default_workers
+
+buffer_size = 4 * 1024 * 1024
+
+# Collection modes, links fall back to a real copy when they are not possible
+COPY = "copy"
+HARDLINK = "hardlink"
+REFLINK = "reflink"
+SYMLINK = "symlink"
+collect_modes = (COPY, HARDLINK, REFLINK, SYMLINK)
+
+# Linux ioctl to share the extents of a file (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+
+def format_size(size):
+    """
+    Format a byte count for display, e.g. '1.2 GB'.
+    """
+
+    size = float(size)
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if size < 1024.0 or unit == "TB":
+            break
+        size /= 1024.0
+
+    if unit == "B":
+        return str(int(size)) + " B"
+    return "%.1f %s" % (size, unit)
+
+
+def format_duration(seconds):
+    """
+    Format seconds for display, e.g. '1h 02m' or '3m 20s'.
+    """
+
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return "%dh %02dm" % (seconds // 3600, seconds % 3600 // 60)
+    if seconds >= 60:
+        return "%dm %02ds" % (seconds // 60, seconds % 60)
+    return "%ds" % seconds
+
+
+def same_file(source, destination):
+    """
+    True if 'destination' already is 'source', e.g. a file that was collected or hardlinked before.
+    """
+
+    try:
+        return os.path.samefile(source, destination)
+    except (AttributeError, OSError):
+        return os.path.normcase(os.path.abspath(source)) == os.path.normcase(os.path.abspath(destination))
+
+
+def reflink(source, destination):
+    """
+    Copy-on-write clone of 'source'. Raises OSError when the platform or filesystem doesn't support it.
+    """
+
+    if sys.platform.startswith("linux"):
+        import fcntl
+
+        try:
+            with open(source, "rb") as source_file:
+                with open(destination, "wb") as destination_file:
+                    fcntl.ioctl(destination_file.fileno(), FICLONE, source_file.fileno())
+        except (IOError, OSError):
+            try:
+                os.remove(destination)
+            except OSError:
+                pass
+            raise
+
+    elif sys.platform == "darwin":
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.clonefile(source.encode("utf-8"), destination.encode("utf-8"), 0) != 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+
+    else:
+        raise OSError(errno.ENOTSUP, "Reflinks are not supported on this platform")
+
+
+def link_file(mode, source, destination):
+    """
+    Collect 'source' as a hardlink, reflink or symlink at 'destination'.
+    """
+
+    if os.path.lexists(destination):
+        os.remove(destination)
+
+    if mode == HARDLINK:
+        os.link(source, destination)
+    elif mode == REFLINK:
+        reflink(source, destination)
+    elif mode == SYMLINK:
+        os.symlink(os.path.abspath(source), destination)
+
+
+class CopyCancelled(Exception):
+    pass
+
+
+class CopyJob(object):
+    """
+    A single file to copy. 'data' collects whatever the caller needs once the file is done,
+    several callers can share one job when they reference the same file.
+    'offset' is the part of the destination a previous, interrupted archive already wrote.
+    """
+
+    __slots__ = ("source", "destination", "size", "mtime", "data", "checksum", "verify", "skipped", "offset")
+
+    def __init__(self, source, destination, size, mtime):
+        self.source = source
+        self.destination = destination
+        self.size = size
+        self.mtime = mtime
+        self.data = []
+        self.checksum = None
+        self.verify = False
+        self.skipped = False
+        self.offset = 0
+
+
+class CopyEngine(object):
+    """
+    Copies files with a bounded pool of threads.
+
+    Jobs are sorted largest first so the pool doesn't end on a single big file.
+    Bytes are counted while copying for throughput and ETA, a cancel stops
+    between buffers and every failed file is kept with its error.
+
+    An 'ArchiveManifest' is updated as files finish. When 'incremental' is set, files whose
+    size and mtime (or checksum) didn't change since the last run are skipped.
+
+    'mode' collects files as hardlinks, reflinks or symlinks instead of copies.
+    Files that can't be linked, e.g. across volumes, are copied.
+    """
+
+    # Rows are relinked to the new paths of finished files
+    relink_rows = True
+
+    def __init__(self, workers=default_workers, manifest=None, incremental=False, mode=COPY, journal=None):
+        self.workers = workers
+        self.mode = mode
+        self.manifest = manifest
+        self.journal = journal
+        self.incremental = incremental
+        self.use_checksum = manifest != None and manifest.use_checksum
+        self.jobs = {}
+        self.finished = queue.Queue()
+        self.errors = []
+
+        self.lock = threading.Lock()
+        self.threads = []
+        self.cancelled = False
+
+        self.files_done = 0
+        self.files_skipped = 0
+        self.files_linked = 0
+        self.bytes_done = 0
+        self.bytes_total = 0
+        self.start_time = None
+
+    def add(self, source, destination, data=None, stat=None):
+        """
+        Schedule copying 'source' to the file path 'destination'.
+        'stat' is the 'os.stat' result of 'source' if the caller has it already, see 'DirectoryListing.stat'.
+        Returns the 'CopyJob', adding the same destination twice returns the existing job.
+        A different source for a destination that is taken is kept as an error and not copied.
+        """
+
+        job = self.jobs.get(destination)
+        if job != None and not same_file(job.source, source):
+            self.errors.append((source, "Destination " + destination + " is already used by " + job.source))
+            return job
+
+        if job == None:
+            try:
+                if stat == None:
+                    stat = os.stat(source)
+                size = stat.st_size
+                mtime = stat.st_mtime
+            except OSError:
+                size = 0
+                mtime = None
+
+            job = CopyJob(source, destination, size, mtime)
+            self.jobs[destination] = job
+
+            state = None
+            if self.manifest != None and self.incremental and mtime != None:
+                state = self.manifest.compare(destination, size, mtime)
+
+            offset = None
+            if self.journal != None and mtime != None:
+                offset = self.journal.resume_offset(destination, size, mtime)
+                try:
+                    if offset != None and os.path.getsize(destination) < offset:
+                        offset = None
+                except OSError:
+                    offset = None
+
+            if offset == size:
+                # Finished by an interrupted run of the same archive
+                job.skipped = True
+                job.checksum = self.journal.checksum(destination)
+            elif state == UNCHANGED and os.path.isfile(destination):
+                job.skipped = True
+                job.checksum = self.manifest.checksum(destination)
+            else:
+                job.verify = state == VERIFY
+                job.offset = offset or 0
+                self.bytes_total += size - job.offset
+
+        if data != None:
+            job.data.append(data)
+
+        return job
+
+    def start(self):
+        """
+        Create the destination directories and start copying in the background.
+        """
+
+        for directory in set(os.path.dirname(destination) for destination in self.jobs):
+            if directory != "" and not os.path.isdir(directory):
+                try:
+                    os.makedirs(directory)
+                except OSError:
+                    pass
+
+        tasks = queue.Queue()
+        for job in sorted(self.jobs.values(), key=lambda job: job.size, reverse=True):
+            tasks.put(job)
+
+            if self.journal != None:
+                self.journal.plan(job)
+
+        self.start_time = time.time()
+
+        for i in range(max(1, min(self.workers, len(self.jobs)))):
+            thread = threading.Thread(target=self._worker, args=(tasks,), name="asset_checker_copy" + str(i))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def _worker(self, tasks):
+        while not self.cancelled:
+            try:
+                job = tasks.get_nowait()
+            except queue.Empty:
+                return
+
+            error = None
+            try:
+                if job.verify and self.checksum_matches(job):
+                    job.skipped = True
+                elif not job.skipped:
+                    self.transfer_job(job)
+            except CopyCancelled:
+                return
+            except Exception as e:
+                error = str(e)
+
+            with self.lock:
+                self.files_done += 1
+                if error != None:
+                    self.errors.append((job.source, error))
+                else:
+                    if job.skipped:
+                        self.files_skipped += 1
+                    if self.manifest != None:
+                        self.manifest.record(job)
+
+            if error == None and self.journal != None:
+                self.journal.record_done(job)
+
+            self.finished.put((job, error))
+
+    def transfer_job(self, job):
+        """
+        Link or copy a single file. An existing destination that shares the data of the source
+        is replaced unless it already is what 'mode' asks for, writing into it would truncate the source.
+        """
+
+        if os.path.normcase(os.path.abspath(job.source)) == os.path.normcase(os.path.abspath(job.destination)):
+            return self.count_collected(job)
+
+        is_link = os.path.islink(job.destination)
+        if is_link or os.path.exists(job.destination):
+            if same_file(job.source, job.destination):
+                if self.mode == (SYMLINK if is_link else HARDLINK):
+                    return self.count_collected(job)
+                os.remove(job.destination)
+            elif is_link:
+                # Copies must not write through an old symlink into its target
+                os.remove(job.destination)
+
+        if self.mode != COPY:
+            try:
+                link_file(self.mode, job.source, job.destination)
+            except (AttributeError, NotImplementedError, EnvironmentError):
+                # No link support or a different volume
+                pass
+            else:
+                with self.lock:
+                    self.files_linked += 1
+                return self.count_collected(job)
+
+        self.copy_job(job)
+
+    def count_collected(self, job):
+        """
+        Count a file that is in place without copying. With checksums it's hashed instead,
+        the manifest needs them to verify the archive.
+        """
+
+        if self.use_checksum:
+            job.checksum = self.hash_source(job)
+        else:
+            with self.lock:
+                self.bytes_done += job.size
+
+    def copy_job(self, job):
+        """
+        Copy a single file in large buffers and count the bytes as they are written.
+        The checksum is computed on the same buffers when the manifest keeps checksums.
+        A file cut off by an interrupted archive continues at 'job.offset' if the part
+        already written still matches the source. With a journal, progress is recorded
+        as the file is written and a cancelled file is kept to be continued later.
+        """
+
+        checksum = hashlib.md5() if self.use_checksum else None
+
+        offset = 0
+        if job.offset:
+            # A failed link attempt removes the destination
+            partial_checksum = self.verify_partial(job) if os.path.isfile(job.destination) else None
+            if partial_checksum != None:
+                offset = job.offset
+                if checksum != None:
+                    checksum = partial_checksum
+            else:
+                with self.lock:
+                    self.bytes_total += job.offset
+
+        written = offset
+        journaled = offset
+
+        try:
+            with open(job.source, "rb") as source_file:
+                with open(job.destination, "r+b" if offset else "wb") as destination_file:
+                    source_file.seek(offset)
+                    destination_file.seek(offset)
+                    destination_file.truncate()
+
+                    while True:
+                        if self.cancelled:
+                            raise CopyCancelled()
+
+                        buffer = source_file.read(buffer_size)
+                        if not buffer:
+                            break
+
+                        destination_file.write(buffer)
+                        if checksum != None:
+                            checksum.update(buffer)
+
+                        written += len(buffer)
+                        with self.lock:
+                            self.bytes_done += len(buffer)
+
+                        if self.journal != None and written - journaled >= progress_interval:
+                            # Only bytes that reached the file may be recorded
+                            destination_file.flush()
+                            self.journal.record_progress(job, written)
+                            journaled = written
+        except CopyCancelled:
+            # Don't leave half written files behind, unless the journal continues them
+            if self.journal == None:
+                try:
+                    os.remove(job.destination)
+                except OSError:
+                    pass
+            raise
+
+        shutil.copymode(job.source, job.destination)
+
+        if checksum != None:
+            job.checksum = checksum.hexdigest()
+
+    def verify_partial(self, job):
+        """
+        Compare the first 'job.offset' bytes of the destination with the source.
+        Returns the md5 of that part of the source, or None if they differ.
+        """
+
+        checksum = hashlib.md5()
+        left = job.offset
+
+        with open(job.source, "rb") as source_file:
+            with open(job.destination, "rb") as destination_file:
+                while left > 0:
+                    if self.cancelled:
+                        raise CopyCancelled()
+
+                    size = min(buffer_size, left)
+                    buffer = source_file.read(size)
+                    if len(buffer) != size or destination_file.read(size) != buffer:
+                        return None
+
+                    checksum.update(buffer)
+                    left -= size
+
+        return checksum
+
+    def close_journal(self):
+        """
+        Close the journal and remove it if every file was archived, otherwise the next run continues from it.
+        """
+
+        if self.journal == None:
+            return
+
+        if self.cancelled or self.errors:
+            self.journal.close()
+        else:
+            self.journal.remove()
+
+    def checksum_matches(self, job):
+        """
+        Hash the source of a job whose mtime changed and compare it with the manifest.
+        Reading is cheaper than writing the file again.
+        """
+
+        if not os.path.isfile(job.destination):
+            return False
+
+        job.checksum = self.hash_source(job)
+        return job.checksum == self.manifest.checksum(job.destination)
+
+    def hash_source(self, job):
+        """
+        md5 of the source of a job, the bytes are counted as they are read.
+        """
+
+        checksum = hashlib.md5()
+        with open(job.source, "rb") as source_file:
+            while True:
+                if self.cancelled:
+                    raise CopyCancelled()
+
+                buffer = source_file.read(buffer_size)
+                if not buffer:
+                    break
+
+                checksum.update(buffer)
+
+                with self.lock:
+                    self.bytes_done += len(buffer)
+
+        return checksum.hexdigest()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def wait(self):
+        for thread in self.threads:
+            thread.join()
+
+    def is_running(self):
+        return any(thread.is_alive() for thread in self.threads)
+
+    def finished_jobs(self):
+        """
+        Drain the jobs finished since the last call. Returns a list of (job, error), 'error' is None on success.
+        """
+
+        done = []
+        while True:
+            try:
+                done.append(self.finished.get_nowait())
+            except queue.Empty:
+                return done
+
+    def throughput(self):
+        """
+        Average bytes per second since 'start'.
+        """
+
+        if self.start_time == None:
+            return 0.0
+
+        elapsed = time.time() - self.start_time
+        return self.bytes_done / elapsed if elapsed > 0 else 0.0
+
+    def eta(self):
+        """
+        Estimated seconds left, or None while nothing was copied yet.
+        """
+
+        speed = self.throughput()
+        if speed <= 0:
+            return None
+
+        return max(0, self.bytes_total - self.bytes_done) / speed
+
+    def status_text(self):
+        text = "Copying - " + str(self.files_done) + " / " + str(len(self.jobs)) + " files | "
+        if self.files_skipped:
+            text += str(self.files_skipped) + " unchanged | "
+
+        text += format_size(self.bytes_done) + " / " + format_size(self.bytes_total) + " | " + \
+                format_size(self.throughput()) + "/s"
+
+        eta = self.eta()
+        if eta != None:
+            text += " | ETA " + format_duration(eta)
+
+        return text
@@ -0,0 +1,289 @@
+import os
+import threading
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+# os.scandir is Python 3.5+, Houdini's Python 2.7 may ship the 'scandir' backport
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+default_workers = 8
+
+
+def list_directory(path):
+    """
+    List a single directory.
+    Returns (subdirectory names, file names).
+    With scandir the entry type comes from the listing itself, so no extra stat per entry is needed.
+    Symlinks to directories count as files, like 'os.walk' they aren't followed, so a link back
+    to a parent can't make a crawl loop.
+    """
+
+    dirs = []
+    files = []
+
+    if scandir != None:
+        for entry in scandir(path):
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                is_dir = False
+
+            if is_dir:
+                dirs.append(entry.name)
+            else:
+                files.append(entry.name)
+    else:
+        for name in os.listdir(path):
+            entry_path = os.path.join(path, name)
+            if os.path.isdir(entry_path) and not os.path.islink(entry_path):
+                dirs.append(name)
+            else:
+                files.append(name)
+
+    return dirs, files
+
+
+def crawl(root, visit, workers=default_workers):
+    """
+    Visit 'root' and its subdirectories with a bounded pool of threads.
+
+    'visit(directory)' runs in a worker and returns (child directories, result).
+    Yields (directory, result) on the calling thread as soon as each visit finishes.
+    Directories whose visit raises OSError or IOError are skipped.
+    Closing the generator early stops the workers.
+    """
+
+    tasks = queue.Queue()
+    results = queue.Queue()
+    stopped = threading.Event()
+
+    def worker():
+        while True:
+            directory = tasks.get()
+            if directory == None or stopped.is_set():
+                return
+
+            try:
+                children, result = visit(directory)
+                results.put((directory, children, result, None))
+            except Exception as error:
+                results.put((directory, [], None, error))
+
+    threads = []
+    for i in range(max(1, workers)):
+        thread = threading.Thread(target=worker, name="asset_checker_crawl" + str(i))
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+
+    tasks.put(root)
+    pending = 1
+
+    try:
+        while pending:
+            directory, children, result, error = results.get()
+            pending -= 1
+
+            if error != None:
+                if isinstance(error, EnvironmentError):
+                    continue
+                raise error
+
+            for child in children:
+                tasks.put(child)
+                pending += 1
+
+            yield directory, result
+    finally:
+        stopped.set()
+        for thread in threads:
+            tasks.put(None)
+
+
+def walk(root, workers=default_workers):
+    """
+    Parallel version of os.walk.
+    Yields (directory, subdirectory names, file names) in no particular order.
+    """
+
+    def visit(directory):
+        dirs, files = list_directory(directory)
+        base = directory.rstrip("/") + "/"
+        return [base + name for name in dirs], (dirs, files)
+
+    for directory, (dirs, files) in crawl(root.replace("\\", "/"), visit, workers):
+        yield directory, dirs, files
+
+
+def map_threaded(function, items, workers=default_workers):
+    """
+    Call 'function' for every item with a bounded pool of threads.
+    Yields (item, result, error) in completion order. 'error' is the raised exception or None.
+    """
+
+    tasks = queue.Queue()
+    results = queue.Queue()
+    stopped = threading.Event()
+    items = list(items)
+
+    for item in items:
+        tasks.put(item)
+
+    def worker():
+        while not stopped.is_set():
+            try:
+                item = tasks.get_nowait()
+            except queue.Empty:
+                return
+
+            try:
+                results.put((item, function(item), None))
+            except Exception as error:
+                results.put((item, None, error))
+
+    for i in range(max(1, min(workers, len(items)))):
+        thread = threading.Thread(target=worker, name="asset_checker_map" + str(i))
+        thread.daemon = True
+        thread.start()
+
+    try:
+        for i in range(len(items)):
+            yield results.get()
+    finally:
+        stopped.set()
+
+
+class DirectoryListing(object):
+    """
+    Cache of directory listings used for existence checks.
+    Every directory is listed at most once, 'prefetch' lists many directories concurrently.
+    Files are only stat'ed when their size is asked for, once, see 'stat'.
+    """
+
+    def __init__(self, workers=default_workers):
+        self.workers = workers
+        self.listings = {}
+        self.stats = {}
+
+    def _key(self, name):
+        # Windows file names are case insensitive
+        return os.path.normcase(name)
+
+    def _list(self, directory):
+        try:
+            dirs, files = list_directory(directory)
+        except OSError:
+            return None
+
+        return dict((self._key(name), name) for name in files)
+
+    def prefetch(self, directories):
+        """
+        List all directories that are not cached yet with a pool of threads.
+        """
+
+        for directory in self.prefetch_iter(directories):
+            pass
+
+    def prefetch_iter(self, directories):
+        """
+        Same as 'prefetch', but yields every directory as soon as it is listed.
+        Closing the generator early stops the remaining listings.
+        """
+
+        missing = set()
+        for directory in set(directories):
+            if directory in self.listings:
+                yield directory
+            else:
+                missing.add(directory)
+
+        for directory, listing, error in map_threaded(self._list, missing, self.workers):
+            self.listings[directory] = listing
+            yield directory
+
+    def files(self, directory):
+        """
+        Return the files in 'directory' as a dict of case-normalized name -> real name,
+        or None if it can't be listed.
+        """
+
+        if directory not in self.listings:
+            self.listings[directory] = self._list(directory)
+
+        return self.listings[directory]
+
+    def exists(self, path):
+        """
+        Check if the file 'path' exists, using the listing of its directory.
+        """
+
+        directory, name = split_path(path)
+        files = self.files(directory)
+        return files != None and self._key(name) in files
+
+    def stat(self, path):
+        """
+        'os.stat' result of the file 'path', kept so every file is stat'ed at most once.
+        None if it can't be read.
+        """
+
+        directory, name = split_path(path)
+        stats = self.stats.setdefault(directory, {})
+
+        key = self._key(name)
+        if key not in stats:
+            try:
+                stats[key] = os.stat(path)
+            except OSError:
+                stats[key] = None
+
+        return stats[key]
+
+    def size(self, path):
+        stat = self.stat(path)
+        return stat.st_size if stat != None else None
+
+    def invalidate(self, directory=None):
+        if directory == None:
+            self.listings = {}
+            self.stats = {}
+        else:
+            self.listings.pop(directory, None)
+            self.stats.pop(directory, None)
+
+
+def existing_directory(directory):
+    """
+    'directory' or its closest parent that exists. None if no parent exists.
+    """
+
+    while not os.path.isdir(directory):
+        parent = os.path.dirname(directory)
+        if parent == directory or parent == "":
+            return None
+        directory = parent
+
+    return directory
+
+
+def split_path(path):
+    """
+    Split a path into (directory, file name).
+    """
+
+    path = path.replace("\\", "/")
+    if "/" not in path:
+        return ".", path
+
+    directory, name = path.rsplit("/", 1)
+    return directory or "/", name
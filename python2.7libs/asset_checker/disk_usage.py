@@ -0,0 +1,136 @@
+import ctypes
+import os
+
+from copy_engine import format_size
+from crawler import default_workers, existing_directory, split_path
+from scene_assets import asset_subdir, file_sizes, listed_files, row_expanded
+
+categories = ("tex", "geo", "sim")
+
+
+def free_space(path):
+    """
+    Free bytes on the drive of 'path', or of its closest existing parent for targets that
+    don't exist yet. None if it can't be read.
+    """
+
+    directory = existing_directory(path.replace("\\", "/"))
+    if directory == None:
+        return None
+
+    if os.name == "nt":
+        free = ctypes.c_ulonglong(0)
+        if not ctypes.windll.kernel32.GetDiskFreeSpaceExW(ctypes.c_wchar_p(directory), None, None, ctypes.pointer(free)):
+            return None
+        return free.value
+
+    try:
+        stat = os.statvfs(directory)
+    except OSError:
+        return None
+
+    return stat.f_bavail * stat.f_frsize
+
+
+class DiskUsage(object):
+    """
+    Bytes on disk of the files referenced by rows, UDIM tiles and frames included,
+    per category (tex, geo, sim), per node and per directory.
+
+    Files are found in the 'DirectoryListing' of the existence checks and only the referenced
+    ones are stat'ed, once, through the listing. A file referenced by several nodes counts for
+    each of them, but only once in the totals. With 'expanded', the 'row_expanded' results
+    of the rows made beforehand, it doesn't need hou and can run in a thread.
+    'cancelled' and 'progress' are passed on to 'file_sizes', a cancelled usage is incomplete.
+    """
+
+    def __init__(self, rows, listing, workers=default_workers, expanded=None, cancelled=None, progress=None):
+        self.categories = dict((category, 0) for category in categories)
+        self.nodes = {}
+        self.directories = {}
+        self.total = 0
+        self.files = 0
+        self.unreadable = 0
+
+        row_paths = []
+        for i, row in enumerate(rows):
+            if expanded != None:
+                files = listed_files(listing, *expanded[i])
+            else:
+                files = listed_files(listing, *row_expanded(row))
+
+            row_paths.append((row.node_path, [file_path for file_path, last_segment in files]))
+
+        sizes = file_sizes([file_path for node_path, files in row_paths for file_path in files], listing, workers,
+                           cancelled, progress)
+
+        node_files = set()
+        for node_path, files in row_paths:
+            for file_path in files:
+                if (node_path, file_path) in node_files:
+                    continue
+
+                node_files.add((node_path, file_path))
+                self.nodes[node_path] = self.nodes.get(node_path, 0) + (sizes.get(file_path) or 0)
+
+        for file_path, size in sizes.items():
+            if size == None:
+                self.unreadable += 1
+                continue
+
+            self.files += 1
+            self.total += size
+
+            category = asset_subdir(file_path, categories)
+            if category != None:
+                self.categories[category] += size
+
+            directory = split_path(file_path)[0]
+            self.directories[directory] = self.directories.get(directory, 0) + size
+
+    def archive_size(self, hip_file=None):
+        """
+        Bytes an archive of all files and the scene needs, before compression and without incremental skips.
+        """
+
+        size = self.total
+        if hip_file and os.path.isfile(hip_file):
+            size += os.path.getsize(hip_file)
+
+        return size
+
+    def largest(self, sizes, limit):
+        return sorted(sizes.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def summary_text(self):
+        return "Size - " + format_size(self.total) + " (" + \
+               ", ".join(category + " " + format_size(self.categories[category]) for category in categories) + ")"
+
+    def details_text(self, limit=10):
+        """
+        Multi-line breakdown with the 'limit' largest nodes and directories.
+        """
+
+        lines = ["Total: " + format_size(self.total) + " in " + str(self.files) + " files"]
+        lines += [category + ": " + format_size(self.categories[category]) for category in categories]
+
+        if self.unreadable:
+            lines.append(str(self.unreadable) + " file(s) could not be read")
+
+        lines.append("")
+        lines.append("Largest nodes:")
+        lines += ["  " + format_size(size) + "  " + node_path for node_path, size in self.largest(self.nodes, limit)]
+
+        lines.append("")
+        lines.append("Largest directories:")
+        lines += ["  " + format_size(size) + "  " + directory for directory, size in self.largest(self.directories, limit)]
+
+        return "\n".join(lines)
+
+    def report(self):
+        return {"bytes": self.total,
+                "files": self.files,
+                "unreadable": self.unreadable,
+                "categories": dict(self.categories),
+                "nodes": dict(self.nodes),
+                "directories": dict(self.directories)}
@@ -0,0 +1,455 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from crawler import DirectoryListing, crawl, list_directory, walk, default_workers
+
+# Matches the UDIM or frame token of a file name, e.g. 'wood_<udim>.exr' or 'smoke.$F4.vdb'
+token_pattern = re.compile(r"<udim>|[$]F\d*(?![A-Za-z_])")
+digits_pattern = re.compile(r"\d+")
+
+# Seconds between mtime steps, FAT stores them in 2 second steps and SMB shares may round them
+mtime_resolution = 2.0
+
+
+def split_token(name):
+    """
+    Split a file name at its UDIM or frame token.
+    Returns (head, token, tail). 'token' is None if the name has no token.
+    """
+
+    match = token_pattern.search(name)
+    if match == None:
+        return name, None, ""
+
+    return name[:match.start()], match.group(0), name[match.end():]
+
+
+def token_matches(token, digits):
+    """
+    Check if a run of digits found on disk can stand in for 'token'.
+    UDIM tiles are 1001 - 1999, '$F4' needs at least four digits and '$F' is unpadded.
+    """
+
+    if token == "<udim>":
+        return len(digits) == 4 and 1001 <= int(digits) <= 1999
+
+    padding = token[2:]
+    padding = int(padding) if padding else 0
+
+    if padding > 1:
+        return len(digits) == padding or (len(digits) > padding and digits[0] != "0")
+
+    return digits == "0" or digits[0] != "0"
+
+
+class FileIndex(object):
+    """
+    Index of all files below a search root, keyed by file name.
+
+    The root is walked once. Every file is stored under its name and, for every
+    run of digits in the name, under the (head, tail) around that run, so UDIM
+    tiles and frame sequences resolve with a dictionary lookup as well.
+    """
+
+    def __init__(self, extensions=None):
+        self.extensions = extensions
+        self.names = {}
+        self.patterns = {}
+        self.file_count = 0
+
+    def __len__(self):
+        return self.file_count
+
+    def add_files(self, directory, filenames):
+        """
+        Add the files of a single directory to the index.
+        """
+
+        for name in filenames:
+            if self.extensions != None and not name.endswith(self.extensions):
+                continue
+
+            self.file_count += 1
+            self.names.setdefault(name, []).append(directory)
+
+            for match in digits_pattern.finditer(name):
+                key = (name[:match.start()], name[match.end():])
+                self.patterns.setdefault(key, []).append((directory, match.group(0)))
+
+    def build(self, root, workers=default_workers):
+        """
+        Crawl 'root' once and index every file found.
+        """
+
+        for directory, dirs, files in walk(root, workers):
+            self.add_files(directory, files)
+
+        return self
+
+    def find(self, head, token=None, tail=""):
+        """
+        Find all directories containing the file 'head + token + tail'.
+        Returns a list of (directory, file name) in crawl order, one entry per directory.
+        For tokens the file name is the lowest matching tile or frame in that directory.
+        """
+
+        if token == None:
+            return [(directory, head) for directory in self.names.get(head, [])]
+
+        found = {}
+        order = []
+        for directory, digits in self.patterns.get((head, tail), []):
+            if not token_matches(token, digits):
+                continue
+
+            if directory not in found:
+                order.append(directory)
+                found[directory] = digits
+            elif int(digits) < int(found[directory]):
+                found[directory] = digits
+
+        return [(directory, head + found[directory] + tail) for directory in order]
+
+
+def fuzzy_name(name):
+    """
+    Lower case name with every run of digits replaced by '#', so versions, frames and tiles don't count as differences.
+    """
+
+    return digits_pattern.sub("#", name.lower())
+
+
+def trigrams(text):
+    """
+    Set of all three character substrings of 'text', padded so the start and end weigh in as well.
+    """
+
+    text = " " + text + " "
+    return set(text[i:i + 3] for i in range(len(text) - 2))
+
+
+def similarity(grams, other_grams):
+    """
+    Dice coefficient of two trigram sets, 1.0 for equal names.
+    """
+
+    if not grams or not other_grams:
+        return 0.0
+
+    return 2.0 * len(grams & other_grams) / (len(grams) + len(other_grams))
+
+
+class FuzzyIndex(object):
+    """
+    Trigram index of the file names of a 'FileIndex', for files that were renamed,
+    e.g. 'wood_Diffuse_v002.exr' -> 'wood_diff_v003.exr'.
+
+    Names are compared by 'fuzzy_name', only against names with the same extension.
+    Every trigram points to the names containing it. A query only walks the postings
+    of its rarest trigrams, since a name that shares none of them can't reach
+    'min_score', and ranks the candidates found there. Candidates are scored with
+    substring tests against the name instead of building their trigram sets.
+    The index is built on the first lookup.
+    """
+
+    def __init__(self, file_index, min_score=0.6):
+        self.file_index = file_index
+        self.min_score = min_score
+        self.keys = None
+        self.sizes = None
+        self.names = None
+        self.postings = None
+
+    def build(self):
+        self.keys = []
+        self.sizes = []
+        self.names = {}
+        self.postings = {}
+
+        for name in self.file_index.names:
+            key = fuzzy_name(name)
+            if key not in self.names:
+                self.names[key] = []
+
+                extension = key.rsplit(".", 1)[-1]
+                grams = trigrams(key)
+                key_id = len(self.keys)
+                self.keys.append(" " + key + " ")
+                self.sizes.append(len(grams))
+
+                for gram in grams:
+                    self.postings.setdefault((extension, gram), []).append(key_id)
+
+            self.names[key].append(name)
+
+    def candidates(self, key):
+        """
+        (score, fuzzy name) of all indexed names scoring at least 'min_score' against 'key', best first.
+        """
+
+        if self.postings == None:
+            self.build()
+
+        extension = key.rsplit(".", 1)[-1]
+        grams = trigrams(key)
+        size = len(grams)
+
+        # Dice >= t needs at least t * n / (2 - t) shared trigrams for a query of n trigrams,
+        # so every match shares one of the n - that + 1 rarest ones. Names with less than
+        # t / (2 - t) or more than (2 - t) / t times as many trigrams can't match either.
+        ratio = self.min_score / (2.0 - self.min_score)
+        needed = max(1, int(ratio * size))
+        min_size = ratio * size
+        max_size = size / ratio if ratio > 0 else float("inf")
+
+        rare = sorted(grams, key=lambda gram: len(self.postings.get((extension, gram), ())))
+
+        key_ids = set()
+        for gram in rare[:size - needed + 1]:
+            key_ids.update(self.postings.get((extension, gram), ()))
+
+        scored = []
+        for key_id in key_ids:
+            other_size = self.sizes[key_id]
+            if other_size < min_size or other_size > max_size:
+                continue
+
+            padded = self.keys[key_id]
+            score = 2.0 * sum(1 for gram in grams if gram in padded) / (size + other_size)
+            if score >= self.min_score:
+                scored.append((score, padded[1:-1]))
+
+        scored.sort(key=lambda match: (-match[0], match[1]))
+        return scored
+
+    def find(self, head, token=None, tail=""):
+        """
+        Find renamed versions of the file 'head + token + tail'.
+        Returns a list of (score, directory, file name, new head, new tail), best first.
+        For tokens the UDIM or frame digits of the found file name sit between the new head and tail.
+        """
+
+        query = head + (token or "") + tail
+        query_grams = trigrams(query.lower())
+
+        matches = []
+        for score, key in self.candidates(fuzzy_name(head) + ("#" if token != None else "") + fuzzy_name(tail)):
+            # Several versions can share a fuzzy name, the closest and then the highest one wins
+            for name in sorted(self.names[key], key=lambda name: (similarity(query_grams, trigrams(name.lower())), name),
+                               reverse=True):
+                if token == None:
+                    new_head, new_tail = name, ""
+                else:
+                    runs = [match for match in digits_pattern.finditer(name) if token_matches(token, match.group(0))]
+                    if not runs:
+                        continue
+
+                    new_head, new_tail = name[:runs[-1].start()], name[runs[-1].end():]
+
+                matches.extend((score, directory, name, new_head, new_tail) for directory in self.file_index.names[name])
+                break
+
+        return matches
+
+
+def listing_current(mtime, stored):
+    """
+    True if a directory with 'mtime' doesn't have to be listed again, 'stored' is the
+    (mtime, listing time) of its last listing or None. Changes within 'mtime_resolution'
+    of the listing can leave the mtime as it was, so such a listing is never reused.
+    """
+
+    if stored == None:
+        return False
+
+    stored_mtime, listed = stored
+    return stored_mtime == mtime and listed != None and listed - mtime > mtime_resolution
+
+
+class IndexDatabase(object):
+    """
+    Persistent index of crawled search roots, stored as a SQLite file.
+
+    Every directory is stored with its mtime and the time it was listed. A refresh
+    stats the known directories and only lists the ones whose mtime changed, since adding,
+    removing or renaming an entry always touches the mtime of its parent, see 'listing_current'.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, parent TEXT, mtime REAL, listed REAL);
+            CREATE TABLE IF NOT EXISTS files (dir TEXT, name TEXT);
+            CREATE INDEX IF NOT EXISTS files_dir ON files (dir);
+            CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent);
+            CREATE TABLE IF NOT EXISTS listed_dirs (path TEXT PRIMARY KEY, mtime REAL, listed REAL);
+            CREATE TABLE IF NOT EXISTS listed_files (dir TEXT, name TEXT);
+            CREATE INDEX IF NOT EXISTS listed_files_dir ON listed_files (dir);
+            """)
+
+        # Files written before the listing time was stored, their directories are listed once more
+        for table in ("dirs", "listed_dirs"):
+            columns = [column[1] for column in self.connection.execute("PRAGMA table_info(" + table + ")")]
+            if "listed" not in columns:
+                try:
+                    self.connection.execute("ALTER TABLE " + table + " ADD COLUMN listed REAL")
+                except sqlite3.OperationalError:
+                    # Added by another process in the meantime
+                    pass
+
+    def close(self):
+        self.connection.close()
+
+    def _normalize(self, root):
+        root = root.replace("\\", "/")
+        if len(root) > 1:
+            root = root.rstrip("/")
+
+        return root
+
+    def _subtree(self, root):
+        """
+        SQL condition and arguments selecting 'root' and everything below it.
+        """
+
+        prefix = root if root.endswith("/") else root + "/"
+        return "(path = ? OR (path >= ? AND path < ?))", (root, prefix, prefix[:-1] + "0")
+
+    def refresh(self, root, workers=default_workers):
+        """
+        Bring the stored tree below 'root' up to date.
+        Directories are stat'ed and listed concurrently by 'workers' threads.
+        Returns the amount of directories that had to be listed.
+        """
+
+        root = self._normalize(root)
+        condition, args = self._subtree(root)
+        known = {}
+        children = {}
+        query = "SELECT path, parent, mtime, listed FROM dirs WHERE " + condition
+        for path, parent, mtime, listed_time in self.connection.execute(query, args):
+            known[path] = (mtime, listed_time)
+            children.setdefault(parent, []).append(path)
+
+        def visit(directory):
+            mtime = os.stat(directory).st_mtime
+            if listing_current(mtime, known.get(directory)):
+                return children.get(directory, []), None
+
+            listed_time = time.time()
+            dirs, files = list_directory(directory)
+            base = directory.rstrip("/") + "/"
+            return [base + name for name in dirs], (mtime, listed_time, files)
+
+        seen = set()
+        listed = 0
+
+        with self.connection:
+            for directory, result in crawl(root, visit, workers):
+                seen.add(directory)
+                if result == None:
+                    continue
+
+                mtime, listed_time, files = result
+                listed += 1
+
+                self.connection.execute("DELETE FROM files WHERE dir = ?", (directory,))
+                self.connection.executemany("INSERT INTO files (dir, name) VALUES (?, ?)",
+                                            [(directory, name) for name in files])
+                self.connection.execute("INSERT OR REPLACE INTO dirs (path, parent, mtime, listed) VALUES (?, ?, ?, ?)",
+                                        (directory, directory.rstrip("/").rsplit("/", 1)[0], mtime, listed_time))
+
+            removed = [(path,) for path in known if path not in seen]
+            self.connection.executemany("DELETE FROM dirs WHERE path = ?", removed)
+            self.connection.executemany("DELETE FROM files WHERE dir = ?", removed)
+
+        return listed
+
+    def fill(self, file_index, root):
+        """
+        Add all stored files below 'root' to 'file_index'.
+        """
+
+        root = self._normalize(root)
+        condition, args = self._subtree(root)
+        condition = condition.replace("path", "dir")
+
+        current_dir = None
+        names = []
+        for directory, name in self.connection.execute("SELECT dir, name FROM files WHERE " + condition + " ORDER BY dir", args):
+            if directory != current_dir:
+                if names:
+                    file_index.add_files(current_dir, names)
+                current_dir = directory
+                names = []
+            names.append(name)
+
+        if names:
+            file_index.add_files(current_dir, names)
+
+        return file_index
+
+
+class CachedDirectoryListing(DirectoryListing):
+    """
+    'DirectoryListing' backed by the 'listed_dirs' tables of an 'IndexDatabase' file.
+
+    A directory whose mtime didn't change since it was stored costs one stat instead of a listing,
+    see 'listing_current'.
+    Several processes can share the file, e.g. the workers of a batch audit, so a
+    directory referenced by hundreds of scenes is listed only once.
+    """
+
+    def __init__(self, path, workers=default_workers):
+        super(CachedDirectoryListing, self).__init__(workers)
+
+        self.path = path
+        self.local = threading.local()
+
+    def _connection(self):
+        # SQLite connections can't be shared between the listing threads
+        connection = getattr(self.local, "connection", None)
+        if connection == None:
+            connection = IndexDatabase(self.path).connection
+            self.local.connection = connection
+
+        return connection
+
+    def _list(self, directory):
+        try:
+            mtime = os.stat(directory).st_mtime
+        except OSError:
+            return None
+
+        try:
+            files = self._cached_files(directory, mtime)
+        except sqlite3.Error:
+            # A busy or broken cache file must not fail the check
+            return super(CachedDirectoryListing, self)._list(directory)
+        except OSError:
+            return None
+
+        return dict((self._key(name), name) for name in files)
+
+    def _cached_files(self, directory, mtime):
+        connection = self._connection()
+        stored = connection.execute("SELECT mtime, listed FROM listed_dirs WHERE path = ?", (directory,)).fetchone()
+
+        if listing_current(mtime, stored):
+            return [name for name, in connection.execute("SELECT name FROM listed_files WHERE dir = ?", (directory,))]
+
+        listed = time.time()
+        dirs, files = list_directory(directory)
+
+        with connection:
+            connection.execute("DELETE FROM listed_files WHERE dir = ?", (directory,))
+            connection.executemany("INSERT INTO listed_files (dir, name) VALUES (?, ?)",
+                                   [(directory, name) for name in files])
+            connection.execute("INSERT OR REPLACE INTO listed_dirs (path, mtime, listed) VALUES (?, ?, ?)",
+                               (directory, mtime, listed))
+
+        return files
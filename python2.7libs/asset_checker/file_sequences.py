@@ -0,0 +1,133 @@
+import os
+import re
+
+from file_index import token_matches
+
+
+def numbered_pattern(head, token, tail):
+    """
+    Compile a pattern matching the file names of 'head + token + tail'.
+    The tile or frame number is captured in group 1.
+    """
+
+    if token == "<udim>":
+        digits = r"(\d{4})"
+    else:
+        padding = token[2:]
+        padding = int(padding) if padding else 0
+        digits = r"(\d{" + str(max(1, padding)) + r",})"
+
+    # Windows file names are case insensitive
+    flags = re.IGNORECASE if os.name == "nt" else 0
+
+    return re.compile(re.escape(head) + digits + re.escape(tail) + "$", flags)
+
+
+def find_numbered(names, head, token, tail):
+    """
+    Match a directory listing against 'head + token + tail' in a single pass.
+    Returns a dict of tile or frame number -> file name.
+    """
+
+    pattern = numbered_pattern(head, token, tail)
+    found = {}
+
+    for name in names:
+        match = pattern.match(name)
+        if match != None and token_matches(token, match.group(1)):
+            found[int(match.group(1))] = name
+
+    return found
+
+
+def udim_tiles(names, head, tail):
+    """
+    All UDIM tiles (1001 - 1999) of 'head + <udim> + tail' in a directory listing, gaps allowed.
+    Returns a sorted list of (tile, file name).
+    """
+
+    tiles = find_numbered(names, head, "<udim>", tail)
+    return sorted(tiles.items())
+
+
+def frame_ranges(frames):
+    """
+    Collapse frame numbers into a sorted list of (first, last) ranges.
+    """
+
+    ranges = []
+    for frame in sorted(frames):
+        if ranges and frame == ranges[-1][1] + 1:
+            ranges[-1][1] = frame
+        else:
+            ranges.append([frame, frame])
+
+    return [(first, last) for first, last in ranges]
+
+
+def format_ranges(frames):
+    """
+    Format frame numbers for display, e.g. '1012-1019, 1044'.
+    """
+
+    parts = []
+    for first, last in frame_ranges(frames):
+        if first == last:
+            parts.append(str(first))
+        else:
+            parts.append(str(first) + "-" + str(last))
+
+    return ", ".join(parts)
+
+
+class FrameSequence(object):
+    """
+    The frames of a '$F' file sequence found in a single directory listing.
+    'frames' is a dict of frame number -> file name.
+    """
+
+    def __init__(self, frames):
+        self.frames = frames
+
+    def __len__(self):
+        return len(self.frames)
+
+    def first(self):
+        return min(self.frames) if self.frames else None
+
+    def last(self):
+        return max(self.frames) if self.frames else None
+
+    def names(self):
+        """
+        File names of all frames, in frame order.
+        """
+
+        return [self.frames[frame] for frame in sorted(self.frames)]
+
+    def ranges(self):
+        return frame_ranges(self.frames)
+
+    def holes(self, start=None, end=None, step=1):
+        """
+        Frames missing between 'start' and 'end', which default to the first and last frame on disk.
+        Only every 'step'th frame from 'start' on is expected.
+        """
+
+        if start == None:
+            start = self.first()
+        if end == None:
+            end = self.last()
+        if start == None or end == None:
+            return []
+
+        return [frame for frame in range(int(start), int(end) + 1, max(1, int(step))) if frame not in self.frames]
+
+
+def find_sequence(names, head, token, tail):
+    """
+    Resolve the '$F' sequence 'head + token + tail' against a directory listing in one pass.
+    Works for sequences starting at any frame, not only at frame 1.
+    """
+
+    return FrameSequence(find_numbered(names, head, token, tail))
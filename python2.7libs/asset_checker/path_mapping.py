@@ -0,0 +1,102 @@
+import re
+
+# 'G:/...' or '//server/share/...', compared case-insensitively like Windows does
+windows_pattern = re.compile(r"^([A-Za-z]:|//)")
+
+
+def path_components(path):
+    """
+    Components of a forward slash path, without a trailing slash.
+    """
+
+    path = path.replace("\\", "/")
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    return path.split("/")
+
+
+class MappingRule(object):
+    """
+    A single prefix rule, 'source' is replaced by 'target'.
+    """
+
+    __slots__ = ("source", "target", "components", "case_sensitive")
+
+    def __init__(self, source, target):
+        self.source = source
+        self.target = target.replace("\\", "/").rstrip("/")
+        self.components = path_components(source)
+        self.case_sensitive = windows_pattern.match(source.replace("\\", "/")) == None
+
+
+class PathMapping(object):
+    """
+    Prefix rules to move paths between operating systems, e.g. 'G:/Python_Tools' -> '/mnt/tools'.
+
+    Rules are compiled into a trie of path components, so a path is mapped with one walk
+    down its components no matter how many rules there are. The longest matching prefix wins
+    and prefixes only match whole components. Windows prefixes match case-insensitively.
+    """
+
+    def __init__(self, rules=()):
+        self.rules = []
+        self.root = ({}, [])
+
+        for source, target in rules:
+            self.add(source, target)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def add(self, source, target):
+        source = source.strip()
+        target = target.strip()
+        if not source or not target:
+            return
+
+        rule = MappingRule(source, target)
+        self.rules.append(rule)
+
+        node = self.root
+        for component in rule.components:
+            node = node[0].setdefault(component.lower(), ({}, []))
+
+        node[1].append(rule)
+
+    def map(self, path):
+        """
+        'path' with the longest matching prefix replaced, or None if no rule matches.
+        """
+
+        if not self.rules:
+            return None
+
+        components = path.replace("\\", "/").split("/")
+
+        matches = []
+        node = self.root
+        for depth, component in enumerate(components):
+            node = node[0].get(component.lower())
+            if node == None:
+                break
+
+            if node[1]:
+                matches.append((depth + 1, node[1]))
+
+        for depth, rules in reversed(matches):
+            for rule in rules:
+                if rule.case_sensitive and components[:depth] != rule.components:
+                    continue
+
+                rest = components[depth:]
+                return rule.target + "/" + "/".join(rest) if rest else rule.target or "/"
+
+        return None
+
+    def to_list(self):
+        """
+        Rules as a list of [source, target] pairs, e.g. for JSON.
+        """
+
+        return [[rule.source, rule.target] for rule in self.rules]
@@ -0,0 +1,797 @@
+import contextlib
+import os
+import re
+import shutil
+
+import hou
+
+from asset_cache import cache_variable, source_path
+from crawler import DirectoryListing, default_workers, map_threaded, split_path
+from file_index import FileIndex, IndexDatabase, split_token
+from file_sequences import FrameSequence, find_sequence, format_ranges, udim_tiles
+
+tex_extensions = (".pic", ".pic.Z", ".picZ", ".pic.gz", ".picgz", ".rat", ".tbf", ".dsm",
+                  ".picnc", ".piclc", ".rgb", ".rgba", ".sgi", ".tif", ".tif3", ".tif16",
+                  ".tif32", ".tiff", ".yuv", ".pix", ".als", ".cin", ".kdk", ".jpg", ".jpeg",
+                  ".exr", ".png", ".psd", ".psb", ".si", ".tga", ".vst", ".vtg", ".rla", ".rla16",
+                  ".rlb", ".rlb16", ".bmp", ".hdr", ".ptx", ".ptex", ".ies", ".qtl")
+
+geo_extensions = (".geo", ".bgeo", ".geo.gz", ".geogz", ".bgeo.gz", ".bgeogz", ".geo.sc",
+                  ".geosc", ".bgeo.sc", ".bgeosc", ".poly", ".bpoly", ".d", ".rib", ".GoZ",
+                  ".bgeo.lzma", ".bgeo.bz2", ".pmap", ".geo.lzma", ".off",
+                  ".igs", ".ply", ".obj", ".pdb", ".lw", ".lwo", ".geo.bz2", ".bstl", ".eps",
+                  ".ai", ".stl", ".dxf", ".abc", ".fbx")
+
+sim_extensions = (".sim", ".vdb")
+
+asset_extensions = tex_extensions + geo_extensions + sim_extensions
+
+# $NAME or ${NAME}
+variable_pattern = re.compile(r"[$]{?([A-Za-z_][A-Za-z0-9_]*)")
+
+# Variables that change with the current frame instead of the environment
+time_variables = frozenset(("F", "FF", "T", "SF", "ST", "N", "NFRAMES", "FSTART", "FEND", "RFSTART", "RFEND"))
+
+# '$F4' is '$F' padded to 4 digits
+padded_frame_pattern = re.compile(r"F[0-9]+$")
+
+
+def is_time_variable(name):
+    return name in time_variables or padded_frame_pattern.match(name) != None
+
+
+class ExpandCache(object):
+    """
+    Memoized 'hou.expandString'.
+
+    Paths are expanded as directory and file name separately, so thousands of paths in the
+    same directory share one expansion and file names without variables need none.
+    Every entry remembers the variables it used, 'refresh' drops the entries whose
+    variables changed. Backtick expressions and time dependent variables are never cached.
+    """
+
+    def __init__(self):
+        self.expanded = {}
+        self.values = {}
+
+    def refresh(self):
+        """
+        Drop expansions of variables that changed since they were cached. Call before every scan, relink or copy.
+        """
+
+        changed = set(name for name, value in self.values.items() if hou.getenv(name) != value)
+        if not changed:
+            return
+
+        for name in changed:
+            self.values[name] = hou.getenv(name)
+
+        self.expanded = dict((text, (result, names)) for text, (result, names) in self.expanded.items()
+                             if not names & changed)
+
+    def clear(self):
+        self.expanded = {}
+        self.values = {}
+
+    def expand(self, text):
+        if "`" in text:
+            return hou.expandString(text)
+
+        directory, separator, name = text.rpartition("/")
+        if not separator:
+            return self._expand_part(text)
+
+        return self._expand_part(directory) + "/" + self._expand_part(name)
+
+    def _expand_part(self, text):
+        if "$" not in text and "~" not in text:
+            return text
+
+        cached = self.expanded.get(text)
+        if cached != None:
+            return cached[0]
+
+        result = hou.expandString(text)
+
+        names = frozenset(variable_pattern.findall(text))
+        if not any(is_time_variable(name) for name in names):
+            for name in names:
+                if name not in self.values:
+                    self.values[name] = hou.getenv(name)
+
+            self.expanded[text] = (result, names)
+
+        return result
+
+
+expand_cache = ExpandCache()
+
+
+def expand_string(text):
+    """
+    'hou.expandString' through the shared 'ExpandCache'.
+    """
+
+    return expand_cache.expand(text)
+
+
+class AssetRow(object):
+    """
+    A single file reference of the scene.
+    node_path   | Path to node
+    path        | Path to file
+    new_path    | Relink preview
+    mapped_path | Path of a 'PathMapping' rule, written on relink
+    real_path   | Expanded path to file
+    parm        | Node parm
+    is_udim     | Is UDIM boolean
+    is_sequence | Is Sequence boolean
+    missing     | Missing on disk, None until checked
+    frame_range | (start, end, step) expected on disk for sequences
+    sequence    | Expanded sequence to check, see 'sequence_spec'
+    missing_frames | Missing frames of a sequence, e.g. '1012-1019, 1044'
+    """
+
+    __slots__ = ("node_path", "path", "new_path", "mapped_path", "real_path", "parm", "is_udim", "is_sequence",
+                 "missing", "frame_range", "sequence", "missing_frames")
+
+    def __init__(self, node_path, path, real_path, parm, is_udim, is_sequence):
+        self.node_path = node_path
+        self.path = path
+        self.new_path = ""
+        self.mapped_path = ""
+        self.real_path = real_path
+        self.parm = parm
+        self.is_udim = is_udim
+        self.is_sequence = is_sequence
+        self.missing = None
+        self.frame_range = None
+        self.sequence = None
+        self.missing_frames = ""
+
+
+def convert_backslash(path):
+    """
+    Convert backslash to forwardslash.
+    """
+
+    return path.replace("\\", "/")
+
+
+def node_frame_range(node):
+    """
+    (start, end, step) a ROP or cache node writes when it renders a frame range, otherwise the scene frame range.
+    """
+
+    trange = node.parm("trange")
+    frames = node.parmTuple("f")
+    if trange != None and trange.evalAsInt() != 0 and frames != None and len(frames) >= 2:
+        values = frames.eval()
+        step = values[2] if len(values) > 2 else 1
+        return int(round(values[0])), int(round(values[1])), max(1, int(round(step)))
+
+    return int(round(float(hou.expandString("$FSTART")))), int(round(float(hou.expandString("$FEND")))), 1
+
+
+def row_expanded(row):
+    """
+    'expand_file_path' of a row, in the directory its existence is checked in. That's the directory
+    of 'real_path', where path mapping rules, also those matching expanded variables, are applied.
+    """
+
+    directory, head, token, tail = expand_file_path(row.mapped_path or row.path)
+
+    return split_path(convert_backslash(row.real_path))[0], head, token, tail
+
+
+def sequence_spec(row):
+    """
+    (directory, head, token, tail, start, end, step) of a '$F' row, checked against a
+    directory listing by 'missing_frames' without touching hou. None for other rows.
+    """
+
+    if not row.is_sequence or row.frame_range == None:
+        return None
+
+    return row_expanded(row) + tuple(row.frame_range)
+
+
+def missing_frames(listing, sequence):
+    """
+    Frames of a 'sequence_spec' that are not in the listing of its directory.
+    """
+
+    directory, head, token, tail, start, end, step = sequence
+
+    files = listing.files(directory)
+    if files == None:
+        frames = FrameSequence({})
+    else:
+        frames = find_sequence(files.values(), head, token, tail)
+
+    return frames.holes(start, end, step)
+
+
+def path_status(listing, item_path, sequence=None):
+    """
+    (exists, missing frames text) of a row. Sequences exist when no frame of their range is missing,
+    other rows when 'item_path' is in the listing of its directory.
+    """
+
+    if sequence == None:
+        return listing.exists(item_path), ""
+
+    frames = missing_frames(listing, sequence)
+    return not frames, format_ranges(frames)
+
+
+def collect_rows(include_out=False, path_mapping=None):
+    """
+    Collect all texture, geometry and sim file references of the scene as 'AssetRow's.
+    References inside '/out' and ROP networks are skipped unless 'include_out' is set.
+    With a 'PathMapping', rows matching a rule are checked at their mapped path,
+    see 'apply_path_mapping'.
+    """
+
+    rows = []
+    expand_cache.refresh()
+
+    for parm, file_path in hou.fileReferences():
+        if parm == None or not file_path.endswith(asset_extensions):
+            continue
+
+        if not include_out:
+            parm_parent = parm.node().parent().type().name()
+            if parm_parent == "out" or parm_parent == "ropnet":
+                continue
+
+        file_path = convert_backslash(file_path)
+
+        token = split_token(file_path)[1]
+        is_sequence = token != None and token != "<udim>"
+        is_udim = token == "<udim>"
+
+        mapped_path = ""
+        real_path = expand_string(file_path)
+
+        if path_mapping != None:
+            mapped_path = path_mapping.map(file_path) or ""
+            if mapped_path:
+                real_path = expand_string(mapped_path)
+            else:
+                # Variables set to a path of the other OS only resolve here, the parm keeps its variable
+                real_path = path_mapping.map(convert_backslash(real_path)) or real_path
+
+        if is_udim:
+            real_path = real_path.replace("<udim>", "1001")
+
+        row = AssetRow(parm.node().path(), file_path, real_path, parm, is_udim, is_sequence)
+        row.mapped_path = mapped_path
+
+        if is_sequence:
+            row.frame_range = node_frame_range(parm.node())
+            row.sequence = sequence_spec(row)
+
+        rows.append(row)
+
+    return rows
+
+
+def apply_path_mapping(rows):
+    """
+    Move rows that were found at their mapped path over to it. Returns the moved rows,
+    their parms are written with 'set_parms'. Rows missing at the mapped path keep theirs.
+    """
+
+    mapped = []
+    for row in rows:
+        if row.mapped_path and row.missing == False:
+            row.path = row.mapped_path
+            row.mapped_path = ""
+            mapped.append(row)
+
+    return mapped
+
+
+def check_rows(rows, workers=default_workers, listing=None):
+    """
+    Set 'missing' of every row from its real path. Rows are grouped by directory
+    and each directory is listed once. Sequences are checked frame by frame against
+    their frame range from the same listing, see 'path_status'. Returns the positions
+    of the missing rows and the 'DirectoryListing' that was used, 'listing' if one is passed in.
+    """
+
+    row_paths = [convert_backslash(row.real_path) for row in rows]
+
+    if listing == None:
+        listing = DirectoryListing(workers)
+
+    listing.prefetch(split_path(item_path)[0] for item_path in row_paths)
+
+    # Several parms often read the same cache
+    statuses = {}
+
+    missing = []
+    for i, item_path in enumerate(row_paths):
+        key = (item_path, rows[i].sequence)
+        if key not in statuses:
+            statuses[key] = path_status(listing, item_path, rows[i].sequence)
+
+        exists, rows[i].missing_frames = statuses[key]
+        rows[i].missing = not exists
+        if rows[i].missing:
+            missing.append(i)
+
+    return missing, listing
+
+
+def expand_file_path(path):
+    """
+    Expand a parm path without touching its UDIM or frame token.
+    Returns (directory, file name head, token, file name tail). 'token' is None for single files.
+    """
+
+    head, token, tail = split_token(convert_backslash(path))
+    head = convert_backslash(expand_string(head))
+    tail = convert_backslash(expand_string(tail))
+
+    directory, head = split_path(head)
+
+    return directory, head, token, tail
+
+
+def expand_real_path(path):
+    """
+    Expanded path a row with the parm path 'path' is checked at, the first tile for UDIMs.
+    """
+
+    return convert_backslash(expand_string(path)).replace("<udim>", "1001")
+
+
+def split_search_paths(text):
+    """
+    Ordered search roots of a ';' separated search path, e.g. 'D:/cache; $JOB/assets; //server/library'.
+    """
+
+    return [root.strip() for root in text.split(";") if root.strip()]
+
+
+def build_search_index(search_path, index_path, workers=default_workers):
+    """
+    'FileIndex' of all asset files below 'search_path', read from the persistent
+    'IndexDatabase' at 'index_path' which only relists directories that changed.
+    """
+
+    search_index = FileIndex(asset_extensions)
+
+    if search_path != "":
+        index_db = IndexDatabase(index_path)
+        try:
+            index_db.refresh(search_path, workers)
+            index_db.fill(search_index, search_path)
+        finally:
+            index_db.close()
+
+    return search_index
+
+
+@contextlib.contextmanager
+def manual_update_mode():
+    """
+    Hold Houdini's update mode at manual, so parm changes inside the block don't cook anything.
+    The previous mode is restored afterwards and the scene cooks once.
+    """
+
+    update_mode = hou.updateModeSetting()
+    hou.setUpdateMode(hou.updateMode.Manual)
+    try:
+        yield
+    finally:
+        hou.setUpdateMode(update_mode)
+
+
+def set_parms(writes, label="Asset Checker"):
+    """
+    Apply a list of (parm, value) writes as a single undo step with cooking deferred until all are set.
+    """
+
+    if not writes:
+        return
+
+    with manual_update_mode():
+        with hou.undos.group(label):
+            for parm, value in writes:
+                parm.set(value)
+
+
+def row_writes(rows):
+    """
+    (parm, path) writes of all 'rows', e.g. the mapped, relinked or uncached ones.
+    Rows aren't compared with their parms, only pass the ones whose path changed.
+    """
+
+    return [(row.parm, row.path) for row in rows]
+
+
+def relink_row(row, search_index, search_path_text, preview=False, fuzzy_index=None):
+    """
+    Look up the file name of a row in 'search_index' and relink the row to the first match.
+    Without a match the best renamed file of 'fuzzy_index' is used, if one is passed in.
+    UDIM and frame tokens are kept in the new path, leading variables of the current path
+    and of 'search_path_text' are substituted back. Returns True if a match was found.
+    Only the row is changed, its parm is written with 'set_parms' once all rows are relinked.
+    """
+
+    current_path = row.path
+
+    head, token, tail = split_token(current_path.split("/")[-1])
+    head = expand_string(head)
+    tail = expand_string(tail)
+
+    matches = search_index.find(head, token, tail)
+    if matches:
+        root, found_name = matches[0]
+    elif fuzzy_index != None:
+        matches = fuzzy_index.find(head, token, tail)
+        if not matches:
+            return False
+
+        score, root, found_name, head, tail = matches[0]
+    else:
+        return False
+    file_path_abs = root + "/" + found_name
+    file_path = root + "/" + head + (token or "") + tail
+
+    get_variable = current_path.split("/")[0]
+    if get_variable.startswith("$"):
+        expand_var = convert_backslash(expand_string(get_variable))
+        file_path = file_path.replace(expand_var, get_variable)
+
+    if search_path_text.startswith("$"):
+        expand_var = convert_backslash(expand_string(search_path_text))
+        file_path = file_path.replace(expand_var, search_path_text)
+
+    if preview == False:
+        row.path = file_path
+        row.mapped_path = ""
+        row.real_path = file_path_abs
+        row.missing = False
+        row.sequence = sequence_spec(row)
+    else:
+        row.new_path = file_path
+
+    return True
+
+
+def resolve_variable(variable):
+    """
+    Directory of a target like '$HIP' or a plain path.
+    """
+
+    var_path = hou.getenv(variable.replace("$", ""))
+    if var_path == None:
+        var_path = convert_backslash(variable)
+
+    return var_path
+
+
+def asset_subdir(file_path, subdirs):
+    """
+    The tex, geo or sim folder of 'subdirs' (a (tex, geo, sim) tuple) for a file, None for other files.
+    """
+
+    if file_path.endswith(tex_extensions):
+        return subdirs[0]
+    elif file_path.endswith(geo_extensions):
+        return subdirs[1]
+    elif file_path.endswith(sim_extensions):
+        return subdirs[2]
+    return None
+
+
+def row_files(row, listing):
+    """
+    Source files of a row as (source path, file name of the parm), UDIM tiles and frames included.
+    They are looked up in 'listing' where the row was checked, path mapping included, see 'row_expanded'.
+    """
+
+    return listed_files(listing, *row_expanded(row))
+
+
+def listed_files(listing, directory, head, token, tail):
+    """
+    'row_files' of a 'row_expanded' or 'expand_file_path' result. Doesn't need hou, so it can run in a thread.
+    """
+
+    last_segment = head + (token or "") + tail
+
+    if token == None:
+        source_path_abs = directory + "/" + last_segment
+        if listing.exists(source_path_abs):
+            return [(source_path_abs, last_segment)]
+        return []
+
+    # All tiles and frames come from one listing of the directory, gaps included
+    files = listing.files(directory)
+    if files == None:
+        return []
+
+    if token == "<udim>":
+        found_names = [tile_name for tile, tile_name in udim_tiles(files.values(), head, tail)]
+    else:
+        found_names = find_sequence(files.values(), head, token, tail).names()
+
+    return [(directory + "/" + found_name, last_segment) for found_name in found_names]
+
+
+def file_sizes(paths, listing, workers=default_workers, cancelled=None, progress=None):
+    """
+    Path -> size of files. They are stat'ed concurrently through the listing that checked their
+    existence, which keeps the results, e.g. for the 'CopyEngine'. None for unreadable files.
+    'progress' is called with (done, total) after every file. Once 'cancelled' returns True
+    no more files are stat'ed and the sizes so far are returned.
+    """
+
+    paths = set(paths)
+    sizes = {}
+    sized = map_threaded(listing.size, paths, workers)
+
+    try:
+        for file_path, size, error in sized:
+            sizes[file_path] = size
+
+            if progress != None:
+                progress(len(sizes), len(paths))
+
+            if cancelled != None and cancelled():
+                break
+    finally:
+        sized.close()
+
+    return sizes
+
+
+def row_sizes(rows, listing, workers=default_workers):
+    """
+    (asset, bytes) of every row. 'asset' is the expanded path with its UDIM or frame token,
+    the same for every scene referencing the files, and 'bytes' the size of all its tiles or frames.
+    Sizes come from 'listing', see 'file_sizes'.
+    """
+
+    row_assets = []
+    for row in rows:
+        directory, head, token, tail = row_expanded(row)
+        row_assets.append((directory + "/" + head + (token or "") + tail, row_files(row, listing)))
+
+    sizes = file_sizes([item_path for asset, files in row_assets for item_path, last_segment in files],
+                       listing, workers)
+
+    return [(asset, sum(sizes[item_path] or 0 for item_path, last_segment in files)) for asset, files in row_assets]
+
+
+def list_row_directories(rows, workers=default_workers):
+    """
+    List the source directories of 'rows' concurrently.
+    Returns a 'DirectoryListing' used for the existence checks while copying.
+    """
+
+    listing = DirectoryListing(workers)
+    listing.prefetch(set(row_expanded(row)[0] for row in rows))
+
+    return listing
+
+
+def schedule_copy(engine, index, row, listing, target_path, variable, subdirs):
+    """
+    Add the file(s) of a row to a 'CopyEngine', into the tex, geo or sim folder below 'target_path'.
+    The new parm path, below 'variable', is the job data as (index, new path).
+    """
+
+    for item_path, last_segment in row_files(row, listing):
+        subdir = asset_subdir(item_path, subdirs)
+        if subdir == None:
+            continue
+
+        new_path = variable + "/" + subdir + "/" + last_segment
+        destination = target_path + "/" + convert_backslash(subdir) + "/" + os.path.basename(item_path)
+
+        engine.add(item_path, destination, (index, new_path), listing.stat(item_path))
+
+
+def schedule_container(engine, index, row, listing, subdirs):
+    """
+    Add the file(s) of a row to a 'ContainerEngine'. Paths inside the container are relative
+    to its root, where the .hip is stored, and the new parm paths relative to '$HIP'.
+    """
+
+    for item_path, last_segment in row_files(row, listing):
+        subdir = asset_subdir(item_path, subdirs)
+        if subdir == None:
+            continue
+
+        subdir = convert_backslash(subdir).strip("/")
+        arcname = "/".join(part for part in (subdir, os.path.basename(item_path)) if part)
+        new_path = "/".join(part for part in ("$HIP", subdir, last_segment) if part)
+
+        engine.add(item_path, arcname, (index, new_path), listing.stat(item_path))
+
+
+def cache_user_data(parm):
+    """
+    Node user data keeping the path of a parm from before it was cached.
+    """
+
+    return "asset_checker_source_" + parm.name()
+
+
+def set_cache_variable(root):
+    """
+    Point '$ASSET_CACHE' at the cache root. It's a global variable, saved with the scene.
+    """
+
+    hou.hscript("set -g " + cache_variable + " = '" + root + "'")
+    expand_cache.refresh()
+
+
+def uncached_path(row):
+    """
+    The path a cached row had before, None if it doesn't point into the cache.
+    """
+
+    if not row.path.startswith("$" + cache_variable + "/"):
+        return None
+
+    original = row.parm.node().userData(cache_user_data(row.parm))
+    if original:
+        return original
+
+    return source_path(row.path[len(cache_variable) + 2:])
+
+
+def schedule_cache(engine, index, row, listing, cache):
+    """
+    Add the file(s) of a row to a 'CopyEngine' pulling them into an 'AssetCache', the new parm
+    path below '$ASSET_CACHE' is the job data. Rows that are cached already refresh their files
+    from the source. The current path is kept on the node to switch back, see 'uncached_path'.
+    """
+
+    original = uncached_path(row)
+    if original != None:
+        expanded = expand_file_path(original)
+    else:
+        expanded = row_expanded(row)
+
+    directory, head, token, tail = expanded
+    new_path = cache.parm_path(directory, head + (token or "") + tail)
+
+    files = listed_files(listing, *expanded)
+    for file_path, last_segment in files:
+        engine.add(file_path, cache.cache_path(file_path), (index, new_path), listing.stat(file_path))
+
+    if files and original == None:
+        row.parm.node().setUserData(cache_user_data(row.parm), row.path)
+
+
+def uncache_rows(rows):
+    """
+    Point cached rows back at their sources, returns the rows that changed. The parms still have to be set.
+    """
+
+    uncached = []
+    for row in rows:
+        original = uncached_path(row)
+        if original == None:
+            continue
+
+        row.path = original
+        row.real_path = expand_real_path(original)
+        row.parm.node().destroyUserData(cache_user_data(row.parm), must_exist=False)
+        uncached.append(row)
+
+    return uncached
+
+
+def engine_relinks(engine):
+    """
+    Row -> new parm path of all jobs of an engine.
+    """
+
+    relinks = {}
+    for job in engine.jobs.values():
+        for index, new_path in job.data:
+            relinks[index] = new_path
+
+    return relinks
+
+
+def schedule_archive(engine, rows, listing, archive_path, variable, subdirs, temp_hip=None):
+    """
+    Schedule all rows into an archive and save a copy of the scene with its parms pointing
+    into it. The loaded scene keeps its paths. 'engine' is a folder 'CopyEngine' into
+    'archive_path' or a 'ContainerEngine', whose scene is saved to 'temp_hip' and streamed in.
+    """
+
+    engine.relink_rows = False
+    hip_name = os.path.basename(hou.hipFile.path())
+    container = temp_hip != None
+
+    for index, row in enumerate(rows):
+        if container:
+            schedule_container(engine, index, row, listing, subdirs)
+        else:
+            schedule_copy(engine, index, row, listing, archive_path, variable, subdirs)
+
+    if container:
+        save_relinked_hip(rows, temp_hip, engine_relinks(engine))
+        engine.add(temp_hip, hip_name)
+    else:
+        save_relinked_hip(rows, archive_path + "/" + hip_name, engine_relinks(engine))
+
+
+@contextlib.contextmanager
+def hip_callbacks_suppressed():
+    """
+    Remove the hip file event callbacks inside the block, so saving a copy of the scene
+    doesn't run the before and after save hooks of the session. They are added back afterwards.
+    """
+
+    callbacks = hou.hipFile.eventCallbacks()
+    for callback in callbacks:
+        hou.hipFile.removeEventCallback(callback)
+    try:
+        yield
+    finally:
+        for callback in callbacks:
+            hou.hipFile.addEventCallback(callback)
+
+
+def mark_hip_modified():
+    """
+    Flag the scene as having unsaved changes again, saving a copy clears it.
+    """
+
+    root = hou.node("/")
+    root.setUserData("asset_checker_modified", "1")
+    root.destroyUserData("asset_checker_modified")
+
+
+def save_relinked_hip(rows, path, relinks):
+    """
+    Save a copy of the scene to 'path' with the parms of 'relinks' (row -> path) rewritten.
+    The parms, the scene name and its unsaved changes flag are restored afterwards.
+    Without relinks a saved scene is copied as it is on disk.
+    """
+
+    hip_file = hou.hipFile.path()
+    modified = hou.hipFile.hasUnsavedChanges()
+
+    if not relinks and not modified and os.path.isfile(hip_file):
+        shutil.copyfile(hip_file, path)
+        return
+
+    with manual_update_mode(), hou.undos.disabler():
+        try:
+            for index, new_path in relinks.items():
+                rows[index].parm.set(new_path)
+
+            with hip_callbacks_suppressed():
+                hou.hipFile.save(path, save_to_recent_files=False)
+        finally:
+            hou.hipFile.setName(hip_file)
+
+            for index in relinks:
+                rows[index].parm.set(rows[index].path)
+
+            if modified and not hou.hipFile.hasUnsavedChanges():
+                mark_hip_modified()
+
+
+def row_report(row):
+    return {"node": row.node_path,
+            "parm": row.parm.name(),
+            "path": row.path,
+            "real_path": row.real_path,
+            "udim": row.is_udim,
+            "sequence": row.is_sequence,
+            "missing": row.missing,
+            "missing_frames": row.missing_frames}
@@ -0,0 +1,72 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python2.7libs", "asset_checker"))
+
+from archive_manifest import ArchiveManifest
+from copy_engine import HARDLINK, CopyEngine
+
+
+class DestinationConflictTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp().replace("\\", "/")
+        for directory in ("a", "b", "target"):
+            os.makedirs(self.root + "/" + directory)
+
+        for directory in ("a", "b"):
+            with open(self.root + "/" + directory + "/wood.exr", "w") as f:
+                f.write(directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_second_source_for_a_destination_is_an_error(self):
+        engine = CopyEngine(workers=1)
+        destination = self.root + "/target/wood.exr"
+
+        engine.add(self.root + "/a/wood.exr", destination, (0, "$HIP/tex/wood.exr"))
+        job = engine.add(self.root + "/b/wood.exr", destination, (1, "$HIP/tex/wood.exr"))
+
+        self.assertEqual(job.source, self.root + "/a/wood.exr")
+        self.assertEqual(job.data, [(0, "$HIP/tex/wood.exr")])
+        self.assertEqual([source for source, error in engine.errors], [self.root + "/b/wood.exr"])
+
+    def test_same_source_shares_the_job(self):
+        engine = CopyEngine(workers=1)
+        destination = self.root + "/target/wood.exr"
+
+        engine.add(self.root + "/a/wood.exr", destination, (0, "$HIP/tex/wood.exr"))
+        job = engine.add(self.root + "/a/../a/wood.exr", destination, (1, "$HIP/tex/wood.exr"))
+
+        self.assertEqual(len(job.data), 2)
+        self.assertEqual(engine.errors, [])
+
+
+@unittest.skipUnless(hasattr(os, "link"), "needs hardlinks")
+class LinkChecksumTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp().replace("\\", "/")
+        os.makedirs(self.root + "/target/tex")
+        with open(self.root + "/wood.exr", "w") as f:
+            f.write("wood")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_linked_files_get_checksums(self):
+        engine = CopyEngine(1, ArchiveManifest(self.root + "/target", use_checksum=True), mode=HARDLINK)
+        job = engine.add(self.root + "/wood.exr", self.root + "/target/tex/wood.exr")
+
+        engine.start()
+        engine.wait()
+
+        self.assertEqual(engine.errors, [])
+        self.assertEqual(engine.files_linked, 1)
+        self.assertEqual(job.checksum, "22811dd94d65037ef86535740b98dec8")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python2.7libs", "asset_checker"))
+
+from crawler import list_directory, walk
+
+
+@unittest.skipUnless(hasattr(os, "symlink"), "needs symlinks")
+class SymlinkLoopTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp().replace("\\", "/")
+        os.makedirs(self.root + "/a/b")
+        open(self.root + "/a/b/tex.exr", "w").close()
+
+        # Two links back up to parents, followed they never end
+        os.symlink(self.root, self.root + "/a/b/up")
+        os.symlink(self.root + "/a", self.root + "/a/loop")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_walk_visits_every_directory_once(self):
+        visited = sorted(directory for directory, dirs, files in walk(self.root, workers=4))
+
+        self.assertEqual(visited, [self.root, self.root + "/a", self.root + "/a/b"])
+
+    def test_directory_links_are_not_followed(self):
+        dirs, files = list_directory(self.root + "/a/b")
+
+        self.assertEqual(dirs, [])
+        self.assertEqual(sorted(files), ["tex.exr", "up"])
+
+
+if __name__ == "__main__":
+    unittest.main()
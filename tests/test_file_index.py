@@ -0,0 +1,60 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python2.7libs", "asset_checker"))
+
+from file_index import CachedDirectoryListing, FileIndex, IndexDatabase
+
+
+class CoarseMtimeTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp().replace("\\", "/")
+        self.database = self.root + "/index.db"
+        os.makedirs(self.root + "/tex")
+        open(self.root + "/tex/wood.exr", "w").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def add_file_keeping_mtime(self, name):
+        # Like a second change within the mtime resolution of a FAT drive or SMB share
+        mtime = os.stat(self.root + "/tex").st_mtime
+        open(self.root + "/tex/" + name, "w").close()
+        os.utime(self.root + "/tex", (mtime, mtime))
+
+    def test_refresh_lists_recently_changed_directories_again(self):
+        database = IndexDatabase(self.database)
+        database.refresh(self.root + "/tex", workers=1)
+        self.add_file_keeping_mtime("metal.exr")
+        database.refresh(self.root + "/tex", workers=1)
+
+        file_index = database.fill(FileIndex(), self.root + "/tex")
+        database.close()
+
+        self.assertEqual(len(file_index.find("metal.exr")), 1)
+
+    def test_cached_listing_lists_recently_changed_directories_again(self):
+        CachedDirectoryListing(self.database, workers=1).files(self.root + "/tex")
+        self.add_file_keeping_mtime("metal.exr")
+
+        files = CachedDirectoryListing(self.database, workers=1).files(self.root + "/tex")
+
+        self.assertIn("metal.exr", files.values())
+
+    def test_old_listings_are_reused(self):
+        old = time.time() - 60
+        os.utime(self.root + "/tex", (old, old))
+
+        database = IndexDatabase(self.database)
+        database.refresh(self.root + "/tex", workers=1)
+
+        self.assertEqual(database.refresh(self.root + "/tex", workers=1), 0)
+        database.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import re
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python2.7libs", "asset_checker"))
+
+try:
+    import hou
+except ImportError:
+    # Outside of hython, a minimal hou with variables and a current frame
+    hou = types.ModuleType("hou")
+    hou.frame = 1
+    hou.variables = {"HIP": "/hip"}
+
+    def expand_variable(match):
+        name = match.group(1)
+        padded = re.match(r"F([0-9]*)$", name)
+        if padded:
+            return str(hou.frame).zfill(int(padded.group(1) or 0))
+        return hou.variables.get(name, "")
+
+    hou.getenv = lambda name: hou.variables.get(name)
+    hou.expandString = lambda text: re.sub(r"[$]{?([A-Za-z_][A-Za-z0-9_]*)}?", expand_variable, text)
+    hou.setFrame = lambda frame: setattr(hou, "frame", frame)
+    sys.modules["hou"] = hou
+
+from copy_engine import CopyEngine
+from crawler import DirectoryListing
+from scene_assets import AssetRow, ExpandCache, is_time_variable, schedule_copy
+
+
+class TimeVariableTest(unittest.TestCase):
+    def test_padded_frames_are_time_dependent(self):
+        for name in ("F", "F4", "F10"):
+            self.assertTrue(is_time_variable(name), name)
+
+        for name in ("FOO", "HIP", "F4X"):
+            self.assertFalse(is_time_variable(name), name)
+
+    def test_padded_frames_follow_the_current_frame(self):
+        cache = ExpandCache()
+
+        for text in ("$HIP/smoke.$F4.vdb", "$HIP/smoke.${F4}.vdb"):
+            hou.setFrame(1)
+            self.assertTrue(cache.expand(text).endswith("smoke.0001.vdb"))
+
+            hou.setFrame(12)
+            self.assertTrue(cache.expand(text).endswith("smoke.0012.vdb"))
+
+
+class MappedRowTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp().replace("\\", "/")
+        os.makedirs(self.root + "/tex")
+        for name in ("a.exr", "b.exr"):
+            open(self.root + "/tex/" + name, "w").close()
+
+        hou.variables["JOB"] = "G:/Projects"
+
+    def tearDown(self):
+        del hou.variables["JOB"]
+        shutil.rmtree(self.root)
+
+    def test_mapped_rows_are_copied_from_their_mapped_path(self):
+        # A rule matching the parm path, and one matching the expanded value of '$JOB'
+        mapped = AssetRow("/obj/a", "G:/Projects/tex/a.exr", self.root + "/tex/a.exr", None, False, False)
+        mapped.mapped_path = self.root + "/tex/a.exr"
+        variable = AssetRow("/obj/b", "$JOB/tex/b.exr", self.root + "/tex/b.exr", None, False, False)
+
+        engine = CopyEngine(workers=1)
+        listing = DirectoryListing(workers=1)
+        for index, row in enumerate((mapped, variable)):
+            schedule_copy(engine, index, row, listing, self.root + "/target", "$HIP", ("tex", "geo", "sim"))
+
+        self.assertEqual(sorted(job.source for job in engine.jobs.values()),
+                         [self.root + "/tex/a.exr", self.root + "/tex/b.exr"])
+        self.assertEqual(sorted(engine.jobs), [self.root + "/target/tex/a.exr", self.root + "/target/tex/b.exr"])
+
+
+if __name__ == "__main__":
+    unittest.main()